@@ -1,17 +1,12 @@
-from picode import picode
-from os import listdir
-from os.path import isfile, join
+from picode import render_tree
 import os
 
 dir = os.path.dirname(__file__)
 codes_dir = os.path.join(dir, "codes")
 images_dir = os.path.join(dir, "images")
 
-if not os.path.exists(images_dir):
-    os.makedirs(images_dir)
-
-code_files = [f for f in listdir(codes_dir) if isfile(join(codes_dir, f))]
-
-for code_file in code_files:
-    im = picode.to_pic(file_path=codes_dir + "/" + code_file)
-    im.save(images_dir + "\\" + code_file.replace(".", "_") + ".png")
+# The codes are converted to pictures in images_dir, with the same tree. The
+# codes which didn't change since the last run are skipped.
+for result in render_tree([codes_dir], images_dir):
+    if result.error_code is not None:
+        print(result.file + ": " + result.message)
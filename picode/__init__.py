@@ -1 +1,52 @@
-from picode.picode import to_pic, run_main
+from picode.version import __version__
+
+# The modules are imported when one of their names is first used, so that
+# importing picode (and running the command-line tool) stays fast
+_names = {
+    "to_pic": "picode.picode",
+    "to_bytes": "picode.picode",
+    "to_svg": "picode.picode",
+    "Renderer": "picode.picode",
+    "render_tokens": "picode.picode",
+    "tokenize": "picode.tokens",
+    "Tokens": "picode.tokens",
+    "clear_token_cache": "picode.tokens",
+    "token_cache_info": "picode.tokens",
+    "run_main": "picode.cli",
+    "preload_fonts": "picode.fonts",
+    "clear_font_cache": "picode.fonts",
+    "font_cache_info": "picode.fonts",
+    "warmup": "picode.preload",
+    "preload_lexers": "picode.lexers",
+    "clear_lexer_cache": "picode.lexers",
+    "lexer_cache_info": "picode.lexers",
+    "MemoryCache": "picode.cache",
+    "DiskCache": "picode.cache",
+    "render_many": "picode.batch",
+    "render_tree": "picode.tree",
+    "IncrementalRenderer": "picode.incremental",
+    "to_sheet": "picode.sheet",
+    "to_animation": "picode.animation",
+}
+
+__all__ = list(_names)
+
+
+def __getattr__(name):
+    from importlib import import_module
+    module_name = _names.get(name)
+    if module_name is None:
+        # The submodules (picode.picode, picode.util...) are imported too
+        try:
+            return import_module("picode." + name)
+        except ModuleNotFoundError as e:
+            if e.name != "picode." + name:
+                raise
+        raise AttributeError("module 'picode' has no attribute '" + name + "'")
+    value = getattr(import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,3 +1,3 @@
-import picode
+from picode.cli import run_main
 
-picode.run_main()
+run_main()
@@ -0,0 +1,135 @@
+"""
+    Converts codes to pictures from asyncio code, without blocking the
+    event loop
+"""
+
+import asyncio
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from picode.picode import Renderer, to_bytes
+
+# Renderers of the current worker process, by options
+_process_renderers = {}
+
+# Semaphores limiting the conversions of `to_pic_async`, by event loop
+_shared_semaphores = weakref.WeakKeyDictionary()
+
+
+def _get_semaphore(semaphores, max_concurrency: int):
+    """
+        Returns the semaphore of the running event loop in `semaphores`,
+        created in this loop: before Python 3.10, a semaphore is bound to
+        the loop it's created in, which may not run yet.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = semaphores.get(loop)
+    if semaphore is None:
+        semaphore = semaphores[loop] = asyncio.Semaphore(max_concurrency)
+    return semaphore
+
+
+def _render_in_process(options: dict, code: str, file_path: str,
+                       image_format: str):
+    key = repr(sorted(options.items()))
+    renderer = _process_renderers.get(key)
+    if renderer is None:
+        renderer = _process_renderers[key] = Renderer(**options)
+    if file_path:
+        return renderer.render_file_bytes(file_path, image_format)
+    return renderer.render_bytes(code, image_format=image_format)
+
+
+class AsyncRenderer:
+    """
+        Converts codes to encoded pictures in an executor (the default
+        executor of the event loop if none is given), so neither the
+        highlighting, the drawing nor the encoding block the event loop.
+
+        At most `max_concurrency` codes (the number of CPUs by default) are
+        converted at the same time, the other calls wait for their turn.
+        Cancelling a call which is still waiting for its turn, or whose code
+        is queued in a process pool, drops it. A code which is already being
+        converted in a thread is converted to the end, and the result is
+        discarded.
+
+        The options are the ones of `picode.Renderer`. With a process pool,
+        every worker process creates its own renderer, and the `cache` option
+        isn't supported.
+    """
+
+    def __init__(self, executor=None, max_concurrency: int = None, **options):
+        self.executor = executor
+        self.use_processes = isinstance(executor, ProcessPoolExecutor)
+        if self.use_processes and options.get("cache") is not None:
+            raise ValueError(
+                "A cache can't be shared with the worker processes.")
+        # Created here, so incorrect options are reported right away
+        self.renderer = Renderer(**options)
+        self.options = options
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        # Created in the event loops the renderer is used in
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    async def _run(self, code: str, file_path: str, image_format: str):
+        if self.use_processes:
+            function = partial(_render_in_process, self.options, code,
+                               file_path, image_format)
+        elif file_path:
+            function = partial(self.renderer.render_file_bytes, file_path,
+                               image_format)
+        else:
+            function = partial(self.renderer.render_bytes,
+                               code,
+                               image_format=image_format)
+        async with _get_semaphore(self._semaphores, self.max_concurrency):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, function)
+
+    async def render(self, code: str, image_format: str = "PNG"):
+        return await self._run(code, None, image_format)
+
+    async def render_file(self, file_path: str, image_format: str = "PNG"):
+        return await self._run(None, file_path, image_format)
+
+    async def render_many(self,
+                          codes: list,
+                          image_format: str = "PNG",
+                          return_exceptions: bool = False):
+        return await asyncio.gather(
+            *(self.render(code, image_format) for code in codes),
+            return_exceptions=return_exceptions)
+
+
+async def to_pic_async(code: str = None,
+                       file_path: str = None,
+                       image_format: str = "PNG",
+                       executor=None,
+                       **options):
+    """
+        Same as `picode.to_bytes`, run in `executor` (the default executor
+        of the event loop if none is given). The calls of an event loop
+        convert at most as many codes as there are CPUs at the same time,
+        the other ones wait for their turn.
+    """
+    async with _get_semaphore(_shared_semaphores, os.cpu_count() or 1):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, partial(to_bytes, code, file_path, image_format,
+                              **options))
+
+
+async def render_many_async(codes: list,
+                            image_format: str = "PNG",
+                            executor=None,
+                            max_concurrency: int = None,
+                            return_exceptions: bool = False,
+                            **options):
+    """
+        Converts `codes` to encoded pictures with the same options, at most
+        `max_concurrency` at a time. Returns the pictures in the same order
+        as `codes`.
+    """
+    renderer = AsyncRenderer(executor, max_concurrency, **options)
+    return await renderer.render_many(codes, image_format, return_exceptions)
@@ -0,0 +1,122 @@
+"""
+    Animations (GIF, APNG or WebP) of the successive versions of a code
+"""
+
+from PIL import Image
+from picode.encoders import get_format, get_format_from_path
+from picode.engine import measure_code
+from picode.incremental import IncrementalRenderer
+from picode.util import IncorrectEncoding, IncorrectFile, NoCodeNorFileName
+
+# Duration of each frame, in milliseconds
+DEFAULT_FRAME_DURATION = 1000
+
+ANIMATION_FORMATS = ("GIF", "PNG", "WEBP")
+
+
+def get_animation_size(renderer: IncrementalRenderer, versions: list,
+                       file_path: str):
+    """
+        Returns the size of the biggest picture of the versions, measured
+        without drawing them.
+    """
+    lexer = renderer.renderer.get_lexer(versions[0], file_path)
+    width, height = 0, 0
+    for code in versions:
+        nb_lines, max_line_length = measure_code(code, lexer)
+        formatter = renderer.renderer.formatter.with_line_number_chars(
+            len(str(nb_lines)))
+        size = formatter.get_image_size(nb_lines, max_line_length)
+        width, height = max(width, size[0]), max(height, size[1])
+    return width, height
+
+
+def iter_frames(renderer: IncrementalRenderer,
+                versions: list,
+                file_path: str = None,
+                highlight_changes: bool = True,
+                size: tuple = None):
+    """
+        Yields the picture of each version, drawn by `renderer` (so only the
+        lines which changed are drawn), on a canvas of `size` if given.
+    """
+    formatter = renderer.renderer.formatter
+    for code in versions:
+        im = renderer.render(code, file_path, highlight_changes)
+        if size is not None and im.size != size:
+            frame = Image.new(im.mode, size)
+            if im.mode == "P":
+                frame.putpalette(im.getpalette())
+                frame.paste(
+                    formatter.palette.get_index(
+                        formatter.picture_background_color), (0, 0) + size)
+            else:
+                frame.paste(formatter.picture_background_color, (0, 0) + size)
+            frame.paste(im, (0, 0))
+            im = frame
+        yield im
+
+
+def to_animation(versions: list,
+                 file,
+                 image_format: str = None,
+                 file_path: str = None,
+                 duration: int = DEFAULT_FRAME_DURATION,
+                 loop: int = 0,
+                 highlight_changes: bool = True,
+                 **options):
+    """
+        Writes an animation of the successive `versions` of a code to `file`
+        (a path or a binary file object), in `image_format` (GIF, PNG for an
+        APNG, or WEBP), guessed from the extension of the path if not given.
+        The language is guessed from `file_path` and the first version if
+        it isn't given. Each frame lasts `duration` milliseconds (or a list
+        of durations), and the animation is played `loop` times (0 forever).
+        If `highlight_changes` is True, the lines which changed since the
+        previous version are highlighted.
+
+        The versions are drawn by an IncrementalRenderer, which shares the
+        fonts and the lexer and only draws the lines which changed. Pillow
+        then only encodes the region of each frame which differs from the
+        previous one. The options are the ones of `picode.Renderer`. The
+        frames are drawn in indexed colors (see `palette`) unless `palette`
+        is False, which isn't possible for GIF animations.
+    """
+    if not versions:
+        raise NoCodeNorFileName("Please provide the versions of the code.")
+
+    if image_format is None:
+        try:
+            image_format = get_format_from_path(file)
+        except (TypeError, ValueError) as e:
+            raise IncorrectFile("Couldn't save the animation: " + str(e))
+    image_format = get_format(image_format)
+    if image_format not in ANIMATION_FORMATS:
+        raise IncorrectEncoding("Animations can't be encoded in '" +
+                                image_format + "'. The formats are: " +
+                                ", ".join(ANIMATION_FORMATS) + ".")
+
+    # The frames share a palette, which makes them much smaller and faster to
+    # compare. GIF frames need one, which avoids quantizing each of them.
+    if image_format == "GIF":
+        options["palette"] = True
+    options.setdefault("palette", True)
+    renderer = IncrementalRenderer(**options)
+
+    size = get_animation_size(renderer, versions, file_path)
+    # Pillow goes through the frames several times, so they're all kept
+    frames = list(
+        iter_frames(renderer, versions, file_path, highlight_changes, size))
+    settings = {}
+    if image_format == "WEBP":
+        settings["lossless"] = True
+    try:
+        frames[0].save(file,
+                       image_format,
+                       save_all=True,
+                       append_images=frames[1:],
+                       duration=duration,
+                       loop=loop,
+                       **settings)
+    except (OSError, ValueError) as e:
+        raise IncorrectFile("Couldn't save the animation: " + str(e))
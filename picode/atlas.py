@@ -0,0 +1,318 @@
+"""
+    Rendering engine drawing the code from cached glyphs with NumPy
+    (optional dependency: pip install picode[fast])
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from PIL import Image, ImageColor, ImageDraw
+from picode.engine import CanvasFormatter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DEFAULT_ATLAS_CACHE_SIZE = 32
+
+
+class GlyphAtlas:
+    """
+        The antialiased masks of the glyphs of a monospaced font, rendered
+        once each. Every glyph is drawn in a cell 2 characters wide, its
+        origin being half a character from the left of the cell, so glyphs
+        going past their character (italics) aren't cut.
+    """
+
+    def __init__(self, font, char_width: int):
+        self.font = font
+        self.char_width = char_width
+        self.origin = char_width // 2
+        ascent, descent = font.getmetrics()
+        self.cell_height = ascent + descent
+        self.cell_width = char_width * 2
+        # The glyph 0 is empty, and used for spaces and missing characters
+        self.indices = {" ": 0}
+        self.masks = numpy.zeros((1, self.cell_height, self.cell_width),
+                                 dtype=numpy.uint8)
+        self._lock = Lock()
+
+    def _add_glyphs(self, chars):
+        with self._lock:
+            chars = [char for char in chars if char not in self.indices]
+            if not chars:
+                return
+            masks = numpy.zeros(
+                (len(chars), self.cell_height, self.cell_width),
+                dtype=numpy.uint8)
+            cell = Image.new("L", (self.cell_width, self.cell_height))
+            draw = ImageDraw.Draw(cell)
+            for i, char in enumerate(chars):
+                draw.rectangle([(0, 0), cell.size], fill=0)
+                draw.text((self.origin, 0), char, font=self.font, fill=255)
+                masks[i] = numpy.asarray(cell)
+            first_index = len(self.masks)
+            self.masks = numpy.concatenate((self.masks, masks))
+            for i, char in enumerate(chars):
+                self.indices[char] = first_index + i
+
+    def get_indices(self, text: str):
+        indices = self.indices
+        try:
+            return [indices[char] for char in text]
+        except KeyError:
+            self._add_glyphs(set(text))
+            return [self.indices[char] for char in text]
+
+    def get_coverage(self, indices):
+        """
+            Returns the coverage (cell height x (len(indices) + 1) characters)
+            of a row of glyphs, the first one starting at the column `origin`.
+        """
+        masks = self.masks[indices]
+        nb_chars = len(indices)
+        height, cell_width = self.cell_height, self.cell_width
+        width = (nb_chars + 1) * self.char_width
+        coverage = numpy.zeros((height, width + self.char_width),
+                               dtype=numpy.uint8)
+        # As cells are 2 characters wide, the even glyphs don't overlap each
+        # other, neither do the odd ones: each half is laid out in one go
+        even = masks[0::2]
+        coverage[:, :len(even) * cell_width] = even.transpose(1, 0, 2).reshape(
+            height, -1)
+        odd = masks[1::2]
+        if len(odd):
+            start = self.char_width
+            odd_coverage = odd.transpose(1, 0, 2).reshape(height, -1)
+            area = coverage[:, start:start + odd_coverage.shape[1]]
+            numpy.maximum(area, odd_coverage, out=area)
+        return coverage[:, :width]
+
+
+class AtlasCache:
+    """
+        A bounded LRU cache of glyph atlases, keyed by font file, size and
+        character width.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_ATLAS_CACHE_SIZE):
+        self.max_size = max_size
+        self._atlases = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, font, char_width: int):
+        key = (getattr(font, "path", None) or id(font), font.size, char_width)
+        with self._lock:
+            atlas = self._atlases.get(key)
+            if atlas is None:
+                atlas = self._atlases[key] = GlyphAtlas(font, char_width)
+            self._atlases.move_to_end(key)
+            while len(self._atlases) > self.max_size:
+                self._atlases.popitem(last=False)
+            return atlas
+
+    def clear(self):
+        with self._lock:
+            self._atlases.clear()
+
+
+atlas_cache = AtlasCache()
+
+
+def blend(area, coverage, color):
+    """
+        Blends `color` over `area` (a view of the canvas), `coverage` being
+        the opacity of each pixel.
+    """
+    mask = coverage > 0
+    if not mask.any():
+        return
+    alpha = coverage[mask].astype(numpy.uint16)[:, None]
+    pixels = area[mask].astype(numpy.uint16)
+    area[mask] = ((pixels * (255 - alpha) + numpy.array(color, numpy.uint16) *
+                   alpha + 127) // 255).astype(numpy.uint8)
+
+
+class AtlasFormatter(CanvasFormatter):
+    """
+        A CanvasFormatter which draws the glyphs from cached masks with array
+        operations, instead of asking FreeType to draw each token. It relies
+        on the font being monospaced.
+    """
+
+    name = "picode atlas"
+
+    def __init__(self, font_manager, **options):
+        CanvasFormatter.__init__(self, font_manager, **options)
+        self._colors = {}
+
+    def get_color(self, color: str):
+        rgb = self._colors.get(color)
+        if rgb is None:
+            rgb = self._colors[color] = ImageColor.getrgb(color)[:3]
+        return rgb
+
+    def get_atlas(self, font):
+        return atlas_cache.get(font, self.fontw)
+
+    def new_array(self, *shape):
+        return numpy.empty(shape + (3,), dtype=numpy.uint8)
+
+    def get_code_row(self, width: int, code_width: int):
+        """
+            Returns a row of the code area: margin, line numbers background,
+            separator, code background and margin.
+        """
+        row = self.new_array(width)
+        row[:] = self.get_color(self.picture_background_color)
+        left = self.margin
+        row[left:left + code_width] = self.get_color(self.background_color)
+        if self.line_numbers and self.line_number_fg is not None:
+            rectw = self.image_pad + self.line_number_width - self.line_number_pad
+            row[left:left + rectw + 1] = self.get_color(self.line_number_bg)
+            if self.line_number_separator:
+                row[left + rectw] = self.get_color(self.line_number_fg)
+        return row
+
+    def new_canvas(self,
+                   nb_lines: int,
+                   max_line_length: int,
+                   top: int = 0,
+                   height: int = None):
+        """
+            Returns a NumPy array holding the rows [top, top + height[ of the
+            picture. The backgrounds are painted by broadcasting a single
+            row over the whole code area.
+        """
+        width, full_height = self.get_image_size(nb_lines, max_line_length)
+        if height is None:
+            height = full_height - top
+        code_width, code_height = self.get_code_size(nb_lines,
+                                                     max_line_length)
+        canvas = self.new_array(height, width)
+        code_top = min(max(self.margin - top, 0), height)
+        code_bottom = min(max(self.margin + code_height - top, 0), height)
+        picture_background_color = self.get_color(
+            self.picture_background_color)
+        canvas[:code_top] = picture_background_color
+        canvas[code_top:code_bottom] = self.get_code_row(width, code_width)
+        canvas[code_bottom:] = picture_background_color
+        return None, canvas
+
+    def finish_canvas(self, im, canvas):
+        # Pillow stores RGB pictures with 4 bytes per pixel, so an RGB array
+        # can't be shared and is copied once here
+        return Image.fromarray(canvas)
+
+    def fill(self, canvas, left: int, top: int, right: int, bottom: int,
+             color: str):
+        """
+            Fills the rectangle [left, right] x [top, bottom] (bounds
+            included, as with ImageDraw).
+        """
+        canvas[max(top, 0):max(bottom + 1, 0),
+               max(left, 0):max(right + 1, 0)] = self.get_color(color)
+
+    def blend(self, area, coverage, color: str):
+        blend(area, coverage, self.get_color(color))
+
+    def draw_text(self, canvas, x: int, y: int, runs):
+        """
+            Draws the (text, font, color) runs, one after the other, from
+            the point (x, y).
+        """
+        groups = OrderedDict()
+        charno = 0
+        for text, font, color in runs:
+            groups.setdefault((font, color), []).append((charno, text))
+            charno += len(text)
+        if not charno:
+            return
+
+        for (font, color), texts in groups.items():
+            atlas = self.get_atlas(font)
+            indices = [0] * charno
+            for start, text in texts:
+                indices[start:start + len(text)] = atlas.get_indices(text)
+            coverage = atlas.get_coverage(indices)
+
+            left = x - atlas.origin
+            canvas_height, canvas_width = canvas.shape[:2]
+            top, bottom = max(y, 0), min(y + atlas.cell_height, canvas_height)
+            right = min(left + coverage.shape[1], canvas_width)
+            if top >= bottom or right <= max(left, 0):
+                continue
+            coverage = coverage[top - y:bottom - y,
+                                max(left, 0) - left:right - left]
+            self.blend(canvas[top:bottom, max(left, 0):right], coverage,
+                       color)
+
+    def draw_lines(self,
+                   canvas,
+                   lines,
+                   first_lineno: int = 0,
+                   right: int = 0,
+                   first_row: int = None,
+                   top: int = 0):
+        if first_row is None:
+            first_row = first_lineno
+        line_height = self.get_line_height()
+        hl_left = (self.margin + self.image_pad + self.line_number_width -
+                   self.line_number_pad + 1)
+        line_number_font = self.fonts.get_font(self.line_number_bold,
+                                               self.line_number_italic)
+        for i, line in enumerate(lines):
+            lineno = first_lineno + i
+            y = self.get_line_y(first_row + i) - top
+            if lineno + 1 in self.hl_lines:
+                self.fill(canvas, hl_left, y, right, y + line_height,
+                          self.hl_color)
+            if self.line_numbers:
+                self.draw_text(
+                    canvas, self.margin + self.image_pad, y,
+                    [(str(lineno + self.line_number_start).rjust(
+                        self.line_number_chars), line_number_font,
+                      self.line_number_fg)])
+            charno = 0
+            for text, (font, fg, bg, _, _) in line:
+                if bg:
+                    x = self.get_text_x(charno)
+                    self.fill(canvas, x, y, x + len(text) * self.fontw,
+                              y + self.fonth, bg)
+                charno += len(text)
+            self.draw_text(
+                canvas, self.get_text_x(0), y,
+                [(text, font, fg) for text, (font, fg, _, _, _) in line])
+
+
+class PaletteFormatter(AtlasFormatter):
+    """
+        An AtlasFormatter drawing in indexed colors: the canvas holds one
+        byte per pixel, the index of its color in the palette, and the
+        glyphs are blended with the precomputed shades of the palette.
+    """
+
+    name = "picode palette"
+
+    def get_color(self, color: str):
+        index = self._colors.get(color)
+        if index is None:
+            index = self._colors[color] = self.palette.get_index(color)
+        return index
+
+    def new_array(self, *shape):
+        return numpy.empty(shape, dtype=numpy.uint8)
+
+    def finish_canvas(self, im, canvas):
+        height, width = canvas.shape
+        # The picture shares the memory of the array
+        im = Image.frombuffer("P", (width, height), canvas, "raw", "P", 0, 1)
+        im.putpalette(self.palette.data)
+        return im
+
+    def blend(self, area, coverage, color: str):
+        table = self.palette.get_blend_table(self.get_color(color))
+        nb_levels = self.palette.shades + 1
+        levels = ((coverage.astype(numpy.uint16) * nb_levels + 127) //
+                  255).astype(numpy.uint8)
+        area[...] = table[area, levels]
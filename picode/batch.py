@@ -0,0 +1,148 @@
+"""
+    Converts many code files to pictures, possibly in parallel
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from picode.stats import RenderStats, stage
+from picode.util import IncorrectEncoding, IncorrectFile, PicodeException
+
+# error_code and message are None when the file was converted successfully,
+# stats is only set when profiling, skipped is True when the picture was up to
+# date (see picode.tree)
+RenderResult = namedtuple(
+    "RenderResult",
+    ["file", "output", "error_code", "message", "stats", "skipped"],
+    defaults=[None, False])
+
+# Renderer of the current worker process, created once by `_init_worker`
+_worker_renderer = None
+
+
+def get_output_path(file: str, output_files: list, index: int):
+    try:
+        return output_files[index]
+    except IndexError:
+        return file[:file.rfind(".")] + ".png"
+
+
+def get_page_path(output: str, page: int):
+    """
+        Returns the path of the page `page` (starting at 1) of a picture.
+    """
+    root, extension = os.path.splitext(output)
+    return root + "_" + str(page) + extension
+
+
+def _save_error(output: str, e: OSError):
+    return IncorrectFile("Couldn't save the picture '" + output + "': " +
+                         str(e))
+
+
+def _render_file(renderer,
+                 file: str,
+                 output: str,
+                 max_lines_per_image: int = None,
+                 stream: bool = False,
+                 profile: bool = False):
+    stats = RenderStats() if profile else None
+    # Only the errors of the writes are reported as saving errors: the code
+    # file is read by the renderer, which reports its own errors. The SVG and
+    # streamed pictures are written while they're drawn.
+    try:
+        if output.lower().endswith(".svg"):
+            with stage(stats, "render"):
+                try:
+                    renderer.render_file_svg(file, output)
+                except OSError as e:
+                    raise _save_error(output, e)
+        elif max_lines_per_image:
+            with stage(stats, "render"):
+                for i, im in enumerate(
+                        renderer.render_file_pages(file, max_lines_per_image)):
+                    page_path = get_page_path(output, i + 1)
+                    try:
+                        renderer.save(im, page_path)
+                    except OSError as e:
+                        raise _save_error(page_path, e)
+        elif stream:
+            if not output.lower().endswith(".png"):
+                raise IncorrectEncoding("Only PNG pictures can be streamed, "
+                                        "not '" + output + "'.")
+            with stage(stats, "render"):
+                try:
+                    renderer.render_file_stream(file, output)
+                except OSError as e:
+                    raise _save_error(output, e)
+        else:
+            im = renderer.render_file(file, stats)
+            with stage(stats, "save"):
+                try:
+                    renderer.save(im, output)
+                except OSError as e:
+                    raise _save_error(output, e)
+    except PicodeException as e:
+        return RenderResult(file, output, e.error_code, e.message, stats)
+    return RenderResult(file, output, None, None, stats)
+
+
+def _init_worker(options: dict):
+    from picode.picode import Renderer
+    global _worker_renderer
+    _worker_renderer = Renderer(**options)
+
+
+def _render_file_in_worker(file: str, output: str, max_lines_per_image: int,
+                           stream: bool, profile: bool):
+    return _render_file(_worker_renderer, file, output, max_lines_per_image,
+                        stream, profile)
+
+
+def render_many(files: list,
+                output_files: list = [],
+                jobs: int = 1,
+                max_lines_per_image: int = None,
+                stream: bool = False,
+                profile: bool = False,
+                **options):
+    """
+        Converts `files` to pictures, saved to `output_files` (or to the
+        input file name with the `png` extension). The files are spread over
+        `jobs` processes (all the CPUs if `jobs` is 0 or None). The options
+        are the ones of `picode.Renderer`.
+        If `max_lines_per_image` is given, each picture is split into
+        numbered pictures (`output_1.png`, `output_2.png`...). If `stream` is
+        True, the pictures are drawn and encoded as strips (PNG only). If
+        `profile` is True, the results hold the RenderStats of the files.
+        Returns a RenderResult per file, in the same order as `files`.
+        A failing file doesn't stop the other ones from being converted.
+    """
+    from picode.picode import Renderer
+
+    # Created here even when using workers, so incorrect options are reported
+    # before starting any process
+    renderer = Renderer(**options)
+
+    outputs = [
+        get_output_path(file, output_files, i) for i, file in enumerate(files)
+    ]
+
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(files))
+
+    if jobs <= 1:
+        return [
+            _render_file(renderer, file, output, max_lines_per_image, stream,
+                         profile) for file, output in zip(files, outputs)
+        ]
+
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=_init_worker,
+                             initargs=(options,)) as executor:
+        return list(
+            executor.map(_render_file_in_worker, files, outputs,
+                         repeat(max_lines_per_image), repeat(stream),
+                         repeat(profile)))
@@ -0,0 +1,341 @@
+"""
+    Benchmarks of the rendering pipeline, stage by stage
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from io import BytesIO
+import PIL
+import pygments
+from PIL import Image
+from picode.picode import Renderer, to_bytes, __version__
+from picode.defaults import (DEFAULT_ENGINE, DEFAULT_FONT_PATHS,
+                             DEFAULT_FONT_SIZE, DEFAULT_PRESET, ENGINES,
+                             PRESETS)
+from picode.engine import get_line_length
+from picode.fonts import FileFontManager, clear_font_cache
+from picode.lexers import clear_lexer_cache, detect_lexer
+from picode.tokens import clear_token_cache
+
+# Snippets repeated to build the codes of the corpus
+SNIPPETS = {
+    "python":
+        '''def fibonacci(n: int) -> int:
+    """Returns the n-th Fibonacci number."""
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b  # Next one
+    return a
+
+
+class Greeter:
+
+    def __init__(self, name):
+        self.name = name
+
+    def greet(self):
+        print(f"Hello {self.name}! {fibonacci(10)}")
+
+''',
+    "c":
+        '''#include <stdio.h>
+
+/* Returns the n-th Fibonacci number */
+static unsigned long fibonacci(unsigned int n)
+{
+    unsigned long a = 0, b = 1;
+    for (unsigned int i = 0; i < n; i++) {
+        unsigned long t = a + b;
+        a = b;
+        b = t;
+    }
+    return a;
+}
+
+int main(void)
+{
+    printf("%lu\\n", fibonacci(10));
+    return 0;
+}
+
+''',
+    "javascript":
+        '''// Returns the n-th Fibonacci number
+function fibonacci(n) {
+    let [a, b] = [0, 1];
+    for (let i = 0; i < n; i++) {
+        [a, b] = [b, a + b];
+    }
+    return a;
+}
+
+class Greeter {
+    constructor(name) {
+        this.name = name;
+    }
+
+    greet() {
+        console.log(`Hello ${this.name}! ${fibonacci(10)}`);
+    }
+}
+
+''',
+    "go":
+        '''package main
+
+import "fmt"
+
+// Fibonacci returns the n-th Fibonacci number
+func Fibonacci(n int) int {
+	a, b := 0, 1
+	for i := 0; i < n; i++ {
+		a, b = b, a+b
+	}
+	return a
+}
+
+func main() {
+	fmt.Printf("%d\\n", Fibonacci(10))
+}
+
+'''
+}
+
+# Number of lines of the codes of each size
+SIZES = {"small": 10, "medium": 300, "huge": 3000}
+
+STAGES = ("validation", "fonts", "lexer_guess", "lexing", "layout", "canvas",
+          "drawing", "encode", "decode", "total")
+
+
+def make_code(language: str, nb_lines: int):
+    snippet = SNIPPETS[language].splitlines(True)
+    lines = (snippet * (nb_lines // len(snippet) + 1))[:nb_lines]
+    return "".join(lines)
+
+
+def _time(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def bench_code(code: str, repeat: int = 3, **options):
+    """
+        Times every stage of the conversion of `code`, `repeat` times.
+        Returns the list of the durations (in seconds) of each stage.
+    """
+    timings = {stage: [] for stage in STAGES}
+    font_size = options.get("font_size", DEFAULT_FONT_SIZE)
+    for _ in range(repeat):
+        # The caches are emptied, so every run measures the full work
+        clear_font_cache()
+        clear_lexer_cache()
+        clear_token_cache()
+
+        duration, _ = _time(
+            lambda: FileFontManager(DEFAULT_FONT_PATHS, font_size))
+        timings["fonts"].append(duration)
+
+        duration, renderer = _time(lambda: Renderer(**options))
+        timings["validation"].append(duration)
+
+        duration, lexer = _time(lambda: detect_lexer(code))
+        timings["lexer_guess"].append(duration)
+
+        duration, tokens = _time(lambda: list(lexer.get_tokens(code)))
+        timings["lexing"].append(duration)
+
+        formatter = renderer.formatter.with_line_number_chars(
+            len(str(code.count("\n"))))
+        duration, lines = _time(lambda: formatter.split_lines(tokens))
+        timings["layout"].append(duration)
+
+        max_line_length = max((get_line_length(line) for line in lines),
+                              default=0)
+        duration, _ = _time(
+            lambda: formatter.new_canvas(len(lines), max_line_length))
+        timings["canvas"].append(duration)
+
+        # Drawing includes the creation of the canvas, which is removed
+        duration, im = _time(lambda: formatter.render_lines(lines))
+        timings["drawing"].append(max(0, duration - timings["canvas"][-1]))
+
+        duration, data = _time(lambda: renderer.encoder.encode(im))
+        timings["encode"].append(duration)
+
+        duration, _ = _time(lambda: Image.open(BytesIO(data)).load())
+        timings["decode"].append(duration)
+
+        clear_font_cache()
+        clear_lexer_cache()
+        clear_token_cache()
+        duration, _ = _time(lambda: to_bytes(code=code, **options))
+        timings["total"].append(duration)
+    return timings
+
+
+def summarize(durations: list):
+    return {
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "mean": statistics.mean(durations)
+    }
+
+
+def run(languages=None, sizes=None, repeat: int = 3, **options):
+    """
+        Runs the benchmarks over the corpus and returns the results as a
+        dict, which can be dumped to JSON.
+    """
+    results = []
+    for language in languages or SNIPPETS:
+        for size in sizes or SIZES:
+            code = make_code(language, SIZES[size])
+            timings = bench_code(code, repeat, **options)
+            results.append({
+                "language": language,
+                "size": size,
+                "lines": SIZES[size],
+                "characters": len(code),
+                "stages": {
+                    stage: summarize(durations)
+                    for stage, durations in timings.items()
+                }
+            })
+    return {
+        "picode": __version__,
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "pygments": pygments.__version__,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "options": options,
+        "results": results
+    }
+
+
+def bench_startup(repeat: int = 10):
+    """
+        Times, `repeat` times, new Python processes importing picode,
+        answering `picode --version` and converting a small file (with and
+        without its language given), to catch regressions of the startup
+        time. Returns the list of the durations (in seconds) of each command.
+    """
+    picode_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [picode_dir, env.get("PYTHONPATH")]))
+    env.pop("PICODE_SERVER", None)
+    python = [sys.executable, "-m", "picode"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, "small.py")
+        with open(file, "w") as f:
+            f.write(make_code("python", SIZES["small"]))
+        output = os.path.join(directory, "small.png")
+        commands = {
+            "python": [sys.executable, "-c", "pass"],
+            "import": [sys.executable, "-c", "import picode"],
+            "version": python + ["--version"],
+            "render": python + [file, "-o", output],
+            "render_language": python + [file, "-o", output, "-l", "python"]
+        }
+        timings = {name: [] for name in commands}
+        for _ in range(repeat):
+            for name, command in commands.items():
+                duration, _ = _time(lambda: subprocess.run(
+                    command, env=env, stdout=subprocess.DEVNULL, check=True))
+                timings[name].append(duration)
+    return timings
+
+
+def run_startup(repeat: int = 10):
+    """
+        Runs the startup benchmarks and returns the results as a dict, which
+        can be dumped to JSON.
+    """
+    return {
+        "picode": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "startup": {
+            name: summarize(durations)
+            for name, durations in bench_startup(repeat).items()
+        }
+    }
+
+
+def main(argv):
+    parser = ArgumentParser(
+        prog="picode bench",
+        description=
+        "Times each stage of the conversion of codes to pictures and prints the results as JSON."
+    )
+
+    parser.add_argument("-l",
+                        "--languages",
+                        nargs="*",
+                        choices=list(SNIPPETS),
+                        help="Specifies the languages of the codes.")
+
+    parser.add_argument("-s",
+                        "--sizes",
+                        nargs="*",
+                        choices=list(SIZES),
+                        help="Specifies the sizes of the codes.")
+
+    parser.add_argument("-r",
+                        "--repeat",
+                        type=int,
+                        default=3,
+                        help="Specifies how many times each code is converted.")
+
+    parser.add_argument("-e",
+                        "--engine",
+                        choices=ENGINES,
+                        default=DEFAULT_ENGINE,
+                        help="Specifies the engine drawing the codes.")
+
+    parser.add_argument("-ep",
+                        "--encoding-preset",
+                        choices=list(PRESETS),
+                        default=DEFAULT_PRESET,
+                        help="Specifies how the pictures are encoded.")
+
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help=
+        "Times the startup of the command-line tool instead (--version and the conversion of a small file, in new processes)."
+    )
+
+    parser.add_argument("-o",
+                        "--output",
+                        help="Writes the results to this file.")
+
+    args = parser.parse_args(argv[1:])
+
+    if args.startup:
+        results = run_startup(args.repeat)
+    else:
+        results = run(args.languages,
+                      args.sizes,
+                      args.repeat,
+                      engine=args.engine,
+                      encoding_preset=args.encoding_preset)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return 0
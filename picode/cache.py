@@ -0,0 +1,197 @@
+"""
+    Caches of encoded pictures, keyed by the code and the render options
+"""
+
+import os
+import tempfile
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+
+DEFAULT_MEMORY_CACHE_SIZE = 64 * 1024 * 1024
+DEFAULT_DISK_CACHE_SIZE = 512 * 1024 * 1024
+
+# Bumped whenever the rendering changes, so old entries aren't used anymore
+CACHE_VERSION = 1
+
+
+def make_key(code: str, file_name: str, options: dict, image_format: str):
+    """
+        Returns a stable hash of the code, the file name (which may be used
+        to guess the language) and the normalized render options.
+    """
+    key = sha256()
+    key.update(str(CACHE_VERSION).encode("ascii"))
+    key.update(b"\0" + code.encode("utf-8", "surrogatepass"))
+    key.update(b"\0" + (file_name or "").encode("utf-8", "surrogatepass"))
+    key.update(b"\0" + image_format.upper().encode("ascii"))
+    for name in sorted(options):
+        key.update(("\0" + name + "=" + repr(options[name])).encode(
+            "utf-8", "surrogatepass"))
+    return key.hexdigest()
+
+
+class MemoryCache:
+    """
+        An in-memory LRU cache of encoded pictures, holding at most
+        `max_bytes` bytes.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "size": self.size,
+                "max_size": self.max_bytes
+            }
+
+
+class DiskCache:
+    """
+        An on-disk cache of encoded pictures, stored as one file per entry
+        in `directory`. When the files take more than `max_bytes` bytes, the
+        least recently used ones are removed.
+    """
+
+    suffix = ".picode"
+
+    def __init__(self,
+                 directory: str,
+                 max_bytes: int = DEFAULT_DISK_CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, _, size in self._entries())
+
+    def _path(self, key: str):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _entries(self):
+        """
+            Yields (last use, path, size) for every entry.
+        """
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(self.suffix):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, entry.path, stat.st_size
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            # The modification time is used as the last use time
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        try:
+            previous_size = os.path.getsize(path)
+        except OSError:
+            previous_size = 0
+        # Written to a temporary file first, so a reader never sees a
+        # partially written entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self.size += len(data) - previous_size
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        self.size = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self.size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+    def clear(self):
+        with self._lock:
+            for _, path, _ in list(self._entries()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": sum(1 for _ in self._entries()),
+                "size": self.size,
+                "max_size": self.max_bytes
+            }
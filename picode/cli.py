@@ -0,0 +1,504 @@
+"""
+    The command-line tool. Only the modules needed by the given command are
+    loaded, so answering --version or forwarding the files to a render server
+    doesn't load Pillow nor pygments.
+"""
+
+import glob
+import sys
+import os
+from argparse import ArgumentParser
+from picode.util import PicodeException, IncorrectFile
+from picode.version import __version__
+from picode.defaults import *
+
+
+def main(argv):
+
+    # Answered before loading anything else
+    if "-v" in argv[1:] or "--version" in argv[1:]:
+        print(__version__)
+        return 0
+
+    # A file named like a command is converted, as it was before the command
+    # existed
+    if len(argv) > 1 and not os.path.exists(argv[1]):
+        if argv[1] == "bench":
+            from picode import bench
+            return bench.main(argv[1:])
+
+        if argv[1] == "serve":
+            from picode import server
+            return server.main(argv[1:])
+
+    parser = ArgumentParser(
+        prog="picode",
+        description=
+        "A tool to convert codes to pictures. Run 'picode bench' to benchmark the conversion, 'picode serve' to start a render server.",
+        epilog="Version " + __version__)
+
+    parser.add_argument(
+        "-v",
+        "--version",
+        action="store_true",
+        help="Shows version number and exit.")
+
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help=
+        "Path to the file which is gonna be converted to picture. Directories are converted with their subdirectories, and globs ('src/**/*.py') are expanded."
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        nargs="*",
+        metavar="output_file_name",
+        help=
+        "Specifies the names of the output pictures. No spaces in the names.")
+
+    parser.add_argument(
+        "-od",
+        "--output-dir",
+        help=
+        "Writes the pictures to this directory, mirroring the tree of the files. The files which didn't change since the last conversion are skipped."
+    )
+
+    parser.add_argument(
+        "-of",
+        "--output-format",
+        default="png",
+        help=
+        "Specifies the format of the pictures written to the output directory."
+    )
+
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help=
+        "Converts all the files to the output directory, even the ones which didn't change."
+    )
+
+    parser.add_argument(
+        "--sheet",
+        metavar="output_file_name",
+        help=
+        "Converts all the files into this single picture (a contact sheet), laid out in a grid."
+    )
+
+    parser.add_argument(
+        "--sheet-columns",
+        type=int,
+        default=4,
+        help="Specifies the number of columns of the sheet.")
+
+    parser.add_argument("--sheet-gap",
+                        type=int,
+                        default=0,
+                        help="Specifies the space between the files of the sheet.")
+
+    parser.add_argument(
+        "--sheet-index",
+        metavar="index_file_name",
+        help=
+        "Writes the position and size of each file of the sheet to this JSON file."
+    )
+
+    parser.add_argument(
+        "--animation",
+        metavar="output_file_name",
+        help=
+        "Converts the files, taken as the successive versions of a code, into this animation (gif, png or webp). The lines which changed are highlighted."
+    )
+
+    parser.add_argument(
+        "--frame-duration",
+        type=int,
+        default=1000,
+        help="Specifies how long each frame of the animation lasts, in ms.")
+
+    parser.add_argument(
+        "-l",
+        "--language",
+        help="Specifies the programming language of the file.")
+
+    parser.add_argument(
+        "-al",
+        "--allowed-languages",
+        nargs="*",
+        metavar="language",
+        help=
+        "Specifies the programming languages among which the language of the files is guessed."
+    )
+
+    parser.add_argument(
+        "-sbl",
+        "--space-between-lines",
+        type=int,
+        help="Specifies the space between each line.")
+
+    parser.add_argument(
+        "-fn",
+        "--font-name",
+        help=
+        "Specifies the name of the font which is gonna be used for the picture. Use a monospaced font in order to get a decent result."
+    )
+
+    parser.add_argument(
+        "-fp",
+        "--font-paths",
+        nargs=4,
+        metavar=("Regular", "Italic", "Bold", "Italic+Bold"),
+        help=
+        "Specifies the paths of the font files which are gonna be used for the picture. The order is Regular, Italic, Bold, Bold + Italic. Use a monospaced font in order to get a decent result."
+    )
+
+    parser.add_argument(
+        "-fs",
+        "--font-size",
+        type=int,
+        help="Specifies the font size for the picture.")
+
+    parser.add_argument(
+        "-p", "--padding", type=int, help="Specifies the padding.")
+
+    parser.add_argument(
+        "-sln",
+        "--show-line-numbers",
+        action="store_true",
+        help="Specifies if the line numbers must be shown or not.")
+
+    parser.add_argument(
+        "-lnbc",
+        "--line-numbers-background-color",
+        help="Specifies the background color for the line numbers.")
+
+    parser.add_argument(
+        "-lnc",
+        "--line-numbers-color",
+        help="Specifies the color of the line numbers.")
+
+    parser.add_argument(
+        "-slnb",
+        "--show-line-numbers-bold",
+        action="store_true",
+        help="Specifies if the line numbers must be displayed in bold or not.")
+
+    parser.add_argument(
+        "-slni",
+        "--show-line-numbers-italic",
+        action="store_true",
+        help="Specifies if the line numbers must be displayed in italic or not."
+    )
+
+    parser.add_argument(
+        "-slns",
+        "--show-line-numbers-separator",
+        action="store_true",
+        help=
+        "Specifies if a separator between the line numbers and the code must be displayed or not."
+    )
+
+    parser.add_argument(
+        "-lnp",
+        "--line-numbers-padding",
+        type=int,
+        help="Specifies the padding between the code and the line numbers.")
+
+    parser.add_argument(
+        "-lh",
+        "--lines-highlighted",
+        nargs="*",
+        metavar="line-number",
+        type=int,
+        help="Specifies the lines which must be highlighted.")
+
+    parser.add_argument(
+        "-hc",
+        "--highlight-color",
+        help="Specifies the color for the highlighted lines.")
+
+    parser.add_argument(
+        "-pbc",
+        "--picture-background-color",
+        help="Specifies the background color of the picture.")
+
+    parser.add_argument(
+        "-cbc",
+        "--code-background-color",
+        help="Specifies the background color of the code.")
+
+    parser.add_argument(
+        "-m",
+        "--margin",
+        type=int,
+        help=
+        "Specifies the margin between the code and the border of the picture.")
+
+    parser.add_argument(
+        "-sa",
+        "--strip-all",
+        action="store_true",
+        help="Specifies if the code must be stripped or not.")
+
+    parser.add_argument(
+        "-s",
+        "--style",
+        help="Specifies the style which must be used for the picture.")
+
+    parser.add_argument(
+        "-e",
+        "--engine",
+        choices=ENGINES,
+        help=
+        "Specifies the engine drawing the code. 'atlas' is much faster on big files but needs NumPy."
+    )
+
+    parser.add_argument(
+        "-pal",
+        "--palette",
+        action="store_true",
+        help=
+        "Draws the pictures in indexed colors, with a palette made of the colors of the style. The pictures use less memory and are much smaller."
+    )
+
+    parser.add_argument(
+        "-nef",
+        "--no-embed-font",
+        action="store_true",
+        help=
+        "Only references the font by its name in the SVG pictures, instead of embedding it."
+    )
+
+    parser.add_argument(
+        "-ep",
+        "--encoding-preset",
+        choices=list(PRESETS),
+        help=
+        "Specifies how the pictures are encoded. 'fast' encodes them as fast as possible, 'small' makes the smallest files."
+    )
+
+    parser.add_argument(
+        "-cl",
+        "--compress-level",
+        type=int,
+        help="Specifies the compression level (0 to 9) of the PNG pictures.")
+
+    parser.add_argument(
+        "-q",
+        "--quality",
+        type=int,
+        help="Specifies the quality (1 to 100) of the JPEG and WebP pictures.")
+
+    parser.add_argument(
+        "-pc",
+        "--palette-colors",
+        type=int,
+        help=
+        "Reduces the PNG pictures to a palette of this number of colors (2 to 256, 0 for no palette)."
+    )
+
+    parser.add_argument(
+        "-mlpi",
+        "--max-lines-per-image",
+        type=int,
+        help=
+        "Splits the pictures into several ones of at most this number of lines. The pictures are numbered (file_1.png, file_2.png...)."
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=
+        "Draws and encodes the pictures a few lines at a time, to use less memory on big files. Only PNG pictures can be written this way."
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=
+        "Shows how long each stage of the conversion of each file took.")
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help=
+        "Specifies the number of processes converting the files at the same time. 0 uses all the CPUs."
+    )
+
+    parser.add_argument(
+        "-S",
+        "--server",
+        metavar="address",
+        help=
+        "Sends the files to the render server listening on this address (host:port or unix:path), started with 'picode serve'. Defaults to the environment variable PICODE_SERVER."
+    )
+
+    args = parser.parse_args(argv[1:])
+
+    if not args.files:
+        print("No files were provided. Nothing to do.")
+        return 0
+
+    files = args.files
+    output_files = args.output if args.output else []
+
+    code_background_color = args.code_background_color if args.code_background_color else DEFAULT_CODE_BACKGROUND_COLOR
+    font_name = args.font_name if args.font_name else None
+    font_paths = args.font_paths if args.font_paths else []
+    font_size = args.font_size if args.font_size else DEFAULT_FONT_SIZE
+    highlight_color = args.highlight_color if args.highlight_color else DEFAULT_HIGHLIGHT_COLOR
+    language = args.language if args.language else None
+    line_numbers_background_color = args.line_numbers_background_color if args.line_numbers_background_color else DEFAULT_LINE_NUMBERS_BACKGROUND_COLOR
+    line_numbers_color = args.line_numbers_color if args.line_numbers_color else DEFAULT_LINE_NUMBERS_COLOR
+    line_numbers_padding = args.line_numbers_padding if args.line_numbers_padding else DEFAULT_LINE_NUMBERS_PADDING
+    lines_highlighted = args.lines_highlighted if args.lines_highlighted else []
+    margin = args.margin if args.margin else DEFAULT_MARGIN
+    padding = args.padding if args.padding else DEFAULT_PADDING
+    picture_background_color = args.picture_background_color if args.picture_background_color else DEFAULT_PICTURE_BACKGROUND_COLOR
+    show_line_numbers = args.show_line_numbers
+    show_line_numbers_bold = args.show_line_numbers_bold
+    show_line_numbers_italic = args.show_line_numbers_italic
+    show_line_numbers_separator = args.show_line_numbers_separator
+    space_between_lines = args.space_between_lines if args.space_between_lines else DEFAULT_SPACE_BETWEEN_LINES
+    strip_all = args.strip_all
+    style = args.style if args.style else DEFAULT_STYLE
+    engine = args.engine if args.engine else DEFAULT_ENGINE
+    encoding_preset = args.encoding_preset if args.encoding_preset else DEFAULT_PRESET
+
+    from picode.batch import render_many
+
+    options = dict(language=language,
+                   space_between_lines=space_between_lines,
+                   font_name=font_name,
+                   font_paths=font_paths,
+                   font_size=font_size,
+                   padding=padding,
+                   show_line_numbers=show_line_numbers,
+                   line_numbers_background_color=line_numbers_background_color,
+                   line_numbers_color=line_numbers_color,
+                   show_line_numbers_bold=show_line_numbers_bold,
+                   show_line_numbers_italic=show_line_numbers_italic,
+                   show_line_numbers_separator=show_line_numbers_separator,
+                   line_numbers_padding=line_numbers_padding,
+                   lines_highlighted=lines_highlighted,
+                   highlight_color=highlight_color,
+                   picture_background_color=picture_background_color,
+                   code_background_color=code_background_color,
+                   margin=margin,
+                   strip_all=strip_all,
+                   style=style,
+                   allowed_languages=args.allowed_languages,
+                   engine=engine,
+                   encoding_preset=encoding_preset,
+                   compress_level=args.compress_level,
+                   quality=args.quality,
+                   palette_colors=args.palette_colors,
+                   palette=args.palette,
+                   embed_font=not args.no_embed_font)
+
+    server = args.server or os.environ.get("PICODE_SERVER")
+
+    if args.animation:
+        from picode.animation import to_animation
+        from picode.util import read_file
+        try:
+            to_animation([read_file(file) for file in files],
+                         args.animation,
+                         file_path=files[0],
+                         duration=args.frame_duration,
+                         **options)
+        except PicodeException as e:
+            print("Error n°" + str(e.error_code) + " : " + e.message)
+            return e.error_code
+        return 0
+
+    if args.sheet:
+        from picode.picode import Renderer
+        from picode.sheet import render_sheet, write_sheet_index
+        from picode.tree import find_files
+        try:
+            renderer = Renderer(**options)
+            sheet = render_sheet(renderer,
+                                 [file for file, _ in find_files(files)],
+                                 args.sheet_columns, args.sheet_gap)
+            try:
+                renderer.save(sheet.picture, args.sheet)
+                if args.sheet_index:
+                    write_sheet_index(sheet, args.sheet_index)
+            except (OSError, ValueError) as e:
+                raise IncorrectFile("Couldn't save the sheet '" + args.sheet +
+                                    "': " + str(e))
+        except PicodeException as e:
+            print("Error n°" + str(e.error_code) + " : " + e.message)
+            return e.error_code
+        return 0
+
+    if args.output_dir:
+        from picode.tree import render_tree
+        try:
+            results = render_tree(files,
+                                  args.output_dir,
+                                  args.output_format,
+                                  force=args.force,
+                                  jobs=args.jobs,
+                                  max_lines_per_image=args.max_lines_per_image,
+                                  stream=args.stream,
+                                  profile=args.profile,
+                                  server=server,
+                                  **options)
+        except PicodeException as e:
+            print("Error n°" + str(e.error_code) + " : " + e.message)
+            return e.error_code
+        skipped = sum(result.skipped for result in results)
+        print("Converted " + str(len(results) - skipped) + " file(s), " +
+              str(skipped) + " unchanged file(s) skipped.")
+    else:
+        # The pictures of the files of directories and globs are written
+        # next to them
+        if any(os.path.isdir(file) or glob.has_magic(file) for file in files):
+            from picode.tree import find_files
+            files = [file for file, _ in find_files(files)]
+
+        # Streamed and split pictures are always converted here, as they're
+        # about the memory used by the conversion
+        results = []
+        if server and not args.stream and not args.max_lines_per_image:
+            from picode.client import forward
+            results = forward(server, files, output_files, **options)
+
+        try:
+            # The files the server didn't convert
+            if len(results) < len(files):
+                results += render_many(
+                    files[len(results):],
+                    output_files[len(results):],
+                    jobs=args.jobs,
+                    max_lines_per_image=args.max_lines_per_image,
+                    stream=args.stream,
+                    profile=args.profile,
+                    **options)
+        except PicodeException as e:
+            print("Error n°" + str(e.error_code) + " : " + e.message)
+            return e.error_code
+
+    error_code = 0
+    for result in results:
+        if result.stats is not None:
+            print(result.file + ": " + str(result.stats))
+        if result.error_code is not None:
+            print(result.file + ": Error n°" + str(result.error_code) +
+                  " : " + result.message)
+            error_code = error_code or result.error_code
+    return error_code
+
+
+def run_main():
+    sys.exit(main(sys.argv))
+
+
+if __name__ == "__main__":
+    run_main()
@@ -0,0 +1,126 @@
+"""
+    The client of the render server (see picode.server), which only loads
+    the standard library
+"""
+
+import http.client
+import json
+import os
+import socket
+from picode.batch import RenderResult, get_output_path
+from picode.util import PicodeException, IncorrectFile, read_file
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8317
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def parse_address(address: str):
+    """
+        Returns the path of the socket of an address `unix:path`, or the
+        (host, port) of an address `host:port` or `port`.
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return (host or DEFAULT_HOST, int(port))
+
+
+class RenderClient:
+    """
+        Sends conversions to a RenderServer listening on `address` (see
+        `parse_address`). A single connection is used for all of them.
+    """
+
+    def __init__(self, address: str, timeout: float = 60):
+        address = parse_address(address)
+        if isinstance(address, str):
+            self.connection = UnixHTTPConnection(address, timeout)
+        else:
+            self.connection = http.client.HTTPConnection(*address,
+                                                         timeout=timeout)
+
+    def render(self,
+               code: str,
+               file_name: str = None,
+               image_format: str = "PNG",
+               **options):
+        """
+            Returns the picture of the code, encoded in `image_format`. The
+            options are the ones of `picode.Renderer`, except `cache`.
+        """
+        body = json.dumps({
+            "code": code,
+            "file_name": file_name,
+            "image_format": image_format,
+            "options": options
+        }).encode("utf-8")
+        self.connection.request("POST", "/render", body,
+                                {"Content-Type": "application/json"})
+        response = self.connection.getresponse()
+        data = response.read()
+        if response.status == 200:
+            return data
+        error = json.loads(data)
+        if error.get("error_code") is None:
+            raise ValueError(error["message"])
+        raise PicodeException(error["error_code"], error["message"])
+
+    def close(self):
+        self.connection.close()
+
+
+def forward(address: str, files: list, output_files: list = [], **options):
+    """
+        Same as `picode.render_many`, the files being read here and converted
+        by the server listening on `address`. If the server can't be reached
+        or fails, a warning is printed and the results of the files converted
+        so far are returned: the other files are left to the caller.
+    """
+    results = []
+    try:
+        client = RenderClient(address)
+    except ValueError as e:
+        print("Warning: Couldn't use the server '" + address + "' (" + str(e) +
+              "). Converting the files here.")
+        return results
+    try:
+        for i, file in enumerate(files):
+            output = get_output_path(file, output_files, i)
+            try:
+                code = read_file(file)
+                # The server finds the format from the extension
+                image_format = os.path.splitext(output)[1][1:]
+                try:
+                    data = client.render(code, os.path.basename(file),
+                                         image_format, **options)
+                except (OSError, ValueError) as e:
+                    print("Warning: Couldn't use the server '" + address +
+                          "' (" + str(e) + "). Converting the " +
+                          str(len(files) - i) + " remaining file(s) here.")
+                    break
+                try:
+                    with open(output, "wb") as picture:
+                        picture.write(data)
+                except OSError as e:
+                    raise IncorrectFile("Couldn't save the picture '" + output +
+                                        "': " + str(e))
+            except PicodeException as e:
+                results.append(
+                    RenderResult(file, output, e.error_code, e.message))
+            else:
+                results.append(RenderResult(file, output, None, None))
+    finally:
+        client.close()
+    return results
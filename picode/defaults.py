@@ -0,0 +1,88 @@
+"""
+    The default settings of the conversions
+"""
+
+import os
+from os.path import dirname, abspath
+
+fonts_dir = dirname(abspath(__file__))
+
+# Default configuration
+# ---------------------
+
+# Use monospaced font. Otherwise, the output would be horrible
+DEFAULT_FONT_NAME = "Hack"
+# Normal, Italic, Bold, BoldItalic
+DEFAULT_FONT_PATHS = (os.path.join(fonts_dir, "data/Hack-Regular.ttf"),
+                      os.path.join(fonts_dir, "data/Hack-Italic.ttf"),
+                      os.path.join(fonts_dir, "data/Hack-Bold.ttf"),
+                      os.path.join(fonts_dir, "data/Hack-BoldItalic.ttf"))
+
+DEFAULT_FONT_SIZE = 14
+DEFAULT_MARGIN = 30
+DEFAULT_PADDING = 10
+DEFAULT_SPACE_BETWEEN_LINES = 5
+DEFAULT_SHOW_LINE_NUMBERS = False
+DEFAULT_LINE_NUMBERS_PADDING = 10
+DEFAULT_CODE_BACKGROUND_COLOR = "#151718"
+DEFAULT_PICTURE_BACKGROUND_COLOR = "#A5B2BD"
+DEFAULT_LINE_NUMBERS_COLOR = "#6D8A88"
+DEFAULT_LINE_NUMBERS_BACKGROUND_COLOR = "#151718"
+DEFAULT_HIGHLIGHT_COLOR = "#F7F0AB"
+DEFAULT_LINE_NUMBERS_BOLD = False
+DEFAULT_LINE_NUMBERS_ITALIC = False
+DEFAULT_SHOW_LINE_NUMBERS_SEPARATOR = False
+DEFAULT_STRIP_ALL = False
+DEFAULT_STYLE = "monokai"
+# "pillow" draws the tokens with Pillow, "atlas" draws them from cached glyphs
+# with NumPy, which is much faster on big codes
+DEFAULT_ENGINE = "pillow"
+# SVG pictures embed the glyphs of the font they use
+DEFAULT_EMBED_FONT = True
+
+# ---------------------
+
+DEFAULT_FONT_NAME_UNIX = "Bitstream Vera Sans Mono"
+DEFAULT_FONT_NAME_WIN = "Courier New"
+
+ENGINES = ("pillow", "atlas")
+
+DEFAULT_PRESET = "default"
+
+# Settings of each preset, by format. "default" uses Pillow's defaults,
+# "fast" encodes as fast as possible (for latency-sensitive uses), "small"
+# produces the smallest files (for archival). Pictures of code have few
+# colors, so they can be reduced to a palette without visible loss, and
+# lossless WebP compresses them very well.
+PRESETS = {
+    "default": {},
+    "fast": {
+        "PNG": {
+            "compress_level": 1
+        },
+        "WEBP": {
+            "lossless": True,
+            "quality": 80,
+            "method": 0
+        },
+        "JPEG": {
+            "quality": 90
+        }
+    },
+    "small": {
+        "PNG": {
+            "compress_level": 9,
+            "palette_colors": 256
+        },
+        "WEBP": {
+            "lossless": True,
+            "quality": 90,
+            "method": 4
+        },
+        "JPEG": {
+            "quality": 75,
+            "optimize": True,
+            "progressive": True
+        }
+    }
+}
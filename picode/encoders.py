@@ -0,0 +1,152 @@
+"""
+    Encodes the pictures to PNG (possibly with a palette), WebP, JPEG or any
+    format supported by Pillow, with settings tuned for pictures of code
+"""
+
+import os
+from io import BytesIO
+from PIL import Image
+from picode.defaults import DEFAULT_PRESET, PRESETS
+from picode.util import IncorrectEncoding
+
+# Other names of the formats
+FORMAT_ALIASES = {"JPG": "JPEG"}
+
+# Formats written by picode from the code instead of being encoded by Pillow,
+# with their MIME type
+VECTOR_FORMATS = {"SVG": "image/svg+xml"}
+
+# The enums of the quantization settings were added in Pillow 9.1, which
+# removed the older constants later on
+try:
+    FAST_OCTREE, NO_DITHER = Image.Quantize.FASTOCTREE, Image.Dither.NONE
+except AttributeError:
+    FAST_OCTREE, NO_DITHER = Image.FASTOCTREE, Image.NONE
+
+
+def _find(table: dict, key: str):
+    # Only the most common formats are loaded at first, the other ones are
+    # loaded when needed
+    Image.preinit()
+    if key not in table:
+        Image.init()
+    return table.get(key)
+
+
+def get_format(image_format: str):
+    """
+        Returns the name of a format, given by its name or its extension.
+    """
+    image_format = image_format.upper()
+    image_format = FORMAT_ALIASES.get(image_format, image_format)
+    if image_format in VECTOR_FORMATS:
+        return image_format
+    if not _find(Image.SAVE, image_format):
+        extension_format = _find(Image.EXTENSION, "." + image_format.lower())
+        if not extension_format or extension_format not in Image.SAVE:
+            raise IncorrectEncoding("Pictures can't be encoded in '" +
+                                    image_format + "'.")
+        image_format = extension_format
+    return image_format
+
+
+def get_mime_type(image_format: str):
+    return VECTOR_FORMATS.get(image_format) or Image.MIME.get(
+        image_format, "application/octet-stream")
+
+
+def get_format_from_path(path: str):
+    extension = os.path.splitext(path)[1].lower()
+    if extension[1:].upper() in VECTOR_FORMATS:
+        return extension[1:].upper()
+    image_format = _find(Image.EXTENSION, extension)
+    if image_format is None:
+        raise ValueError("unknown file extension: " + extension)
+    return image_format
+
+
+class Encoder:
+    """
+        Encodes pictures with the settings of `preset` ("default", "fast" or
+        "small"). `compress_level` (0 to 9) overrides the compression level
+        of PNG pictures, `quality` (1 to 100) the quality of JPEG and WebP
+        pictures, and `palette_colors` (2 to 256, 0 for none) the number of
+        colors PNG pictures are reduced to.
+    """
+
+    def __init__(self,
+                 preset: str = DEFAULT_PRESET,
+                 compress_level: int = None,
+                 quality: int = None,
+                 palette_colors: int = None):
+        if preset not in PRESETS:
+            raise IncorrectEncoding("There is no encoding preset named '" +
+                                    str(preset) + "'. The presets are: " +
+                                    ", ".join(PRESETS) + ".")
+
+        if compress_level is not None and not 0 <= compress_level <= 9:
+            raise IncorrectEncoding(
+                "The compression level must be between 0 and 9.")
+
+        if quality is not None and not 1 <= quality <= 100:
+            raise IncorrectEncoding("The quality must be between 1 and 100.")
+
+        if palette_colors and not 2 <= palette_colors <= 256:
+            raise IncorrectEncoding(
+                "The number of colors of the palette must be between 2 and 256."
+            )
+
+        self.preset = preset
+        self.compress_level = compress_level
+        self.quality = quality
+        self.palette_colors = palette_colors
+
+    def get_settings(self, image_format: str):
+        """
+            Returns the settings used to encode pictures in `image_format`.
+        """
+        settings = dict(PRESETS[self.preset].get(image_format, {}))
+        if image_format == "PNG":
+            if self.compress_level is not None:
+                settings["compress_level"] = self.compress_level
+            if self.palette_colors is not None:
+                settings["palette_colors"] = self.palette_colors
+        elif image_format in ("JPEG", "WEBP") and self.quality is not None:
+            settings["quality"] = self.quality
+        return settings
+
+    def save(self, im, file, image_format: str = None):
+        """
+            Writes `im` to `file` (a path or a binary file object) in
+            `image_format`, guessed from the extension of the path if not
+            given.
+        """
+        if image_format is None:
+            image_format = get_format_from_path(file)
+        image_format = get_format(image_format)
+        if image_format in VECTOR_FORMATS:
+            raise IncorrectEncoding(image_format + " pictures are written from "
+                                    "the code, not from a picture.")
+
+        settings = self.get_settings(image_format)
+        palette_colors = settings.pop("palette_colors", 0)
+        if palette_colors and im.mode == "RGB":
+            im = im.quantize(palette_colors,
+                             method=FAST_OCTREE,
+                             dither=NO_DITHER)
+        elif image_format == "JPEG" and im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+
+        try:
+            im.save(file, image_format, **settings)
+        except ValueError as e:
+            raise IncorrectEncoding("Couldn't encode the picture in " +
+                                    image_format + ": " + str(e))
+
+    def encode(self, im, image_format: str = "PNG"):
+        """
+            Returns `im` encoded in `image_format`.
+        """
+        buffer = BytesIO()
+        self.save(im, buffer, image_format)
+        return buffer.getvalue()
@@ -0,0 +1,354 @@
+"""
+    Rendering engine which draws the highlighted code straight onto the
+    final picture (margin included)
+"""
+
+from copy import copy
+from itertools import islice
+from PIL import Image, ImageDraw
+from pygments.formatter import Formatter
+from pygments.util import get_bool_opt, get_int_opt, get_list_opt
+
+TAB_SIZE = 4
+
+# Number of lines drawn at a time when drawing a picture as strips
+DEFAULT_TILE_LINES = 256
+
+
+class CanvasFormatter(Formatter):
+    """
+        A pygments formatter which keeps the layout of pygments'
+        ImageFormatter, but draws the tokens directly onto a picture which
+        already contains the margin, and returns it instead of encoding it.
+    """
+
+    name = "picode canvas"
+    aliases = []
+    filenames = []
+
+    unicodeoutput = False
+
+    def __init__(self, font_manager, **options):
+        Formatter.__init__(self, **options)
+        self.encoding = "latin1"
+        self.styles = dict(self.style)
+        self.fonts = font_manager
+        self.fontw, self.fonth = font_manager.get_char_size()
+
+        self.margin = get_int_opt(options, "margin", 0)
+        self.image_pad = get_int_opt(options, "image_pad", 10)
+        self.line_pad = get_int_opt(options, "line_pad", 2)
+        self.picture_background_color = options.get("picture_background_color",
+                                                    "#FFFFFF")
+        self.background_color = options.get(
+            "background_color", self.style.background_color or "#FFFFFF")
+
+        self.line_number_fg = options.get("line_number_fg", "#888866")
+        self.line_number_bg = options.get("line_number_bg", "#EEEEDD")
+        self.line_number_chars = get_int_opt(options, "line_number_chars", 2)
+        self.line_number_bold = get_bool_opt(options, "line_number_bold", False)
+        self.line_number_italic = get_bool_opt(options, "line_number_italic",
+                                               False)
+        self.line_number_pad = get_int_opt(options, "line_number_pad", 6)
+        self.line_numbers = get_bool_opt(options, "line_numbers", True)
+        self.line_number_separator = get_bool_opt(options,
+                                                  "line_number_separator", True)
+        self.line_number_start = get_int_opt(options, "line_number_start", 1)
+        self.line_number_width = self.get_line_number_width()
+
+        self.hl_lines = set()
+        for line in get_list_opt(options, "hl_lines", []):
+            try:
+                self.hl_lines.add(int(line))
+            except ValueError:
+                pass
+        self.hl_color = options.get("hl_color",
+                                    self.style.highlight_color) or "#FF9900"
+
+        self._run_styles = {}
+
+        # When drawing in indexed colors, the palette is built up front
+        self.palette = None
+        if get_bool_opt(options, "palette", False):
+            from picode.palette import make_palette
+            self.palette = make_palette(self)
+
+    # Layout
+    # ---------------------
+
+    def get_line_number_width(self):
+        if not self.line_numbers:
+            return 0
+        return (self.fontw * self.line_number_chars + self.line_number_pad * 2)
+
+    def with_line_number_chars(self, line_number_chars: int):
+        """
+            Returns a formatter which leaves room for `line_number_chars`
+            digits in the line numbers. The formatter itself isn't modified,
+            so it can be shared between threads.
+        """
+        if line_number_chars == self.line_number_chars:
+            return self
+        formatter = copy(self)
+        formatter.line_number_chars = line_number_chars
+        formatter.line_number_width = formatter.get_line_number_width()
+        return formatter
+
+    def with_hl_lines(self, hl_lines):
+        """
+            Returns a formatter highlighting the lines `hl_lines` (starting
+            at 1) instead. The formatter itself isn't modified.
+        """
+        hl_lines = set(hl_lines)
+        if hl_lines == self.hl_lines:
+            return self
+        formatter = copy(self)
+        formatter.hl_lines = hl_lines
+        return formatter
+
+    def get_line_height(self):
+        return self.fonth + self.line_pad
+
+    def get_line_y(self, lineno: int):
+        return self.margin + self.image_pad + lineno * self.get_line_height()
+
+    def get_text_x(self, charno: int):
+        return (self.margin + self.image_pad + self.line_number_width +
+                charno * self.fontw)
+
+    def get_code_size(self, nb_lines: int, max_line_length: int):
+        """
+            Returns the size of the code area (without the margin).
+        """
+        return (self.image_pad * 2 + self.line_number_width +
+                max_line_length * self.fontw,
+                self.image_pad * 2 + nb_lines * self.get_line_height())
+
+    def get_image_size(self, nb_lines: int, max_line_length: int):
+        code_width, code_height = self.get_code_size(nb_lines, max_line_length)
+        return (code_width + self.margin * 2, code_height + self.margin * 2)
+
+    # Tokens
+    # ---------------------
+
+    def get_run_style(self, ttype):
+        """
+            Returns the (font, foreground, background, bold, italic) used to
+            draw a token.
+        """
+        run_style = self._run_styles.get(ttype)
+        if run_style is None:
+            stype = ttype
+            while stype not in self.styles:
+                stype = stype.parent
+            style = self.styles[stype]
+            run_style = (self.fonts.get_font(style["bold"], style["italic"]),
+                         "#" + style["color"] if style["color"] else "#000",
+                         "#" + style["bgcolor"] if style["bgcolor"] else None,
+                         bool(style["bold"]), bool(style["italic"]))
+            self._run_styles[ttype] = run_style
+        return run_style
+
+    def iter_lines(self, tokensource):
+        """
+            Splits a token stream into lines. Each line is a list of
+            (text, run style) tuples.
+        """
+        line = []
+        charno = 0
+        for ttype, value in tokensource:
+            run_style = self.get_run_style(ttype)
+            for i, part in enumerate(value.split("\n")):
+                if i:
+                    yield line
+                    line = []
+                    charno = 0
+                if part:
+                    part = expand_tabs(part, charno)
+                    line.append((part, run_style))
+                    charno += len(part)
+        if line:
+            yield line
+
+    def split_lines(self, tokensource):
+        return list(self.iter_lines(tokensource))
+
+    # Drawing
+    # ---------------------
+
+    def new_canvas(self,
+                   nb_lines: int,
+                   max_line_length: int,
+                   top: int = 0,
+                   height: int = None):
+        """
+            Returns a canvas holding the rows [top, top + height[ of the
+            picture, with the backgrounds already painted.
+        """
+        width, full_height = self.get_image_size(nb_lines, max_line_length)
+        if height is None:
+            height = full_height - top
+        im = Image.new("RGB", (width, height), self.picture_background_color)
+        draw = ImageDraw.Draw(im)
+        code_width, code_height = self.get_code_size(nb_lines, max_line_length)
+        left, code_top = self.margin, self.margin - top
+        code_bottom = code_top + code_height - 1
+        draw.rectangle([(left, code_top), (left + code_width - 1, code_bottom)],
+                       fill=self.background_color)
+        if self.line_numbers and self.line_number_fg is not None:
+            rectw = self.image_pad + self.line_number_width - self.line_number_pad
+            draw.rectangle([(left, code_top), (left + rectw, code_bottom)],
+                           fill=self.line_number_bg)
+            if self.line_number_separator:
+                draw.line([(left + rectw, code_top),
+                           (left + rectw, code_bottom)],
+                          fill=self.line_number_fg)
+        return im, draw
+
+    def finish_canvas(self, im, draw):
+        """
+            Returns the PIL picture of a canvas once everything is drawn.
+        """
+        if self.palette is not None:
+            return self.palette.reduce(im)
+        return im
+
+    def draw_lines(self,
+                   draw,
+                   lines,
+                   first_lineno: int = 0,
+                   right: int = 0,
+                   first_row: int = None,
+                   top: int = 0):
+        """
+            Draws `lines`, the first one being the line `first_lineno` of the
+            code (starting at 0). It's drawn on the row `first_row` of the
+            picture (`first_lineno` by default), on a canvas starting at the
+            y coordinate `top`. Highlighted bands go up to the x coordinate
+            `right`.
+        """
+        if first_row is None:
+            first_row = first_lineno
+        line_height = self.get_line_height()
+        hl_left = (self.margin + self.image_pad + self.line_number_width -
+                   self.line_number_pad + 1)
+        line_number_font = self.fonts.get_font(self.line_number_bold,
+                                               self.line_number_italic)
+        for i, line in enumerate(lines):
+            lineno = first_lineno + i
+            y = self.get_line_y(first_row + i) - top
+            if lineno + 1 in self.hl_lines:
+                draw.rectangle([(hl_left, y), (right, y + line_height)],
+                               fill=self.hl_color)
+            if self.line_numbers:
+                draw.text((self.margin + self.image_pad, y),
+                          str(lineno + self.line_number_start).rjust(
+                              self.line_number_chars),
+                          font=line_number_font,
+                          fill=self.line_number_fg)
+            charno = 0
+            for text, (font, fg, bg, _, _) in line:
+                x = self.get_text_x(charno)
+                if bg:
+                    draw.rectangle(
+                        [(x, y), (x + len(text) * self.fontw, y + self.fonth)],
+                        fill=bg)
+                draw.text((x, y), text, font=font, fill=fg)
+                charno += len(text)
+
+    def render_lines(self, lines, first_lineno: int = 0):
+        """
+            Returns a picture of `lines`, the first one being the line
+            `first_lineno` of the code (starting at 0).
+        """
+        max_line_length = max((get_line_length(line) for line in lines),
+                              default=0)
+        im, draw = self.new_canvas(len(lines), max_line_length)
+        code_width, _ = self.get_code_size(len(lines), max_line_length)
+        self.draw_lines(draw,
+                        lines,
+                        first_lineno,
+                        right=self.margin + code_width - 1,
+                        first_row=0)
+        return self.finish_canvas(im, draw)
+
+    def iter_tiles(self,
+                   lines,
+                   nb_lines: int,
+                   max_line_length: int,
+                   tile_lines: int = DEFAULT_TILE_LINES):
+        """
+            Draws the picture of `nb_lines` lines (an iterable, which is only
+            consumed `tile_lines` lines at a time) as horizontal strips, from
+            top to bottom. Only one strip is kept in memory at a time.
+        """
+        _, height = self.get_image_size(nb_lines, max_line_length)
+        code_width, _ = self.get_code_size(nb_lines, max_line_length)
+        right = self.margin + code_width - 1
+        lines = iter(lines)
+        previous = []
+        first_lineno = 0
+        top = 0
+        while True:
+            tile = list(islice(lines, tile_lines))
+            end = first_lineno + len(tile)
+            is_last = not tile or end >= nb_lines
+            bottom = height if is_last else self.get_line_y(end)
+            if bottom > top:
+                im, draw = self.new_canvas(nb_lines, max_line_length, top,
+                                           bottom - top)
+                # The previous line is drawn again, as its glyphs may go
+                # over the top of this strip
+                self.draw_lines(draw,
+                                previous + tile,
+                                first_lineno - len(previous),
+                                right,
+                                top=top)
+                yield self.finish_canvas(im, draw)
+            if is_last:
+                return
+            previous = tile[-1:]
+            first_lineno = end
+            top = bottom
+
+    def render(self, tokensource):
+        return self.render_lines(self.split_lines(tokensource))
+
+    def format(self, tokensource, outfile):
+        self.render(tokensource).save(outfile, "PNG")
+
+
+def expand_tabs(text: str, column: int):
+    """
+        Expands the tabs of a text which starts at the given column.
+    """
+    if "\t" not in text:
+        return text
+    offset = column % TAB_SIZE
+    return (" " * offset + text).expandtabs(TAB_SIZE)[offset:]
+
+
+def get_line_length(line):
+    return sum(len(text) for text, _ in line)
+
+
+def measure_code(code: str, lexer=None):
+    """
+        Returns the number of lines and the length of the longest line of the
+        code, as they will be drawn (once the lexer removed the leading and
+        trailing new lines or spaces it's configured to remove).
+    """
+    if "\r" in code:
+        code = code.replace("\r\n", "\n").replace("\r", "\n")
+    if lexer is not None:
+        if lexer.stripall:
+            code = code.strip()
+        elif lexer.stripnl:
+            code = code.strip("\n")
+    nb_lines = code.count("\n") + 1
+    if code.endswith("\n"):
+        nb_lines -= 1
+    if "\t" in code:
+        # The columns of the tabs restart at each line
+        code = code.expandtabs(TAB_SIZE)
+    return nb_lines, max(map(len, code.split("\n")))
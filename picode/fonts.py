@@ -0,0 +1,130 @@
+"""
+    Font loading and caching
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from PIL import ImageFont
+from pygments.formatters.img import FontManager, FontNotFound
+
+DEFAULT_FONT_CACHE_SIZE = 64
+
+# The order in which the font files must be given
+FONT_STYLES = ("NORMAL", "ITALIC", "BOLD", "BOLDITALIC")
+
+
+class FontRegistry:
+    """
+        A bounded LRU registry of loaded fonts, keyed by (source, size).
+    """
+
+    def __init__(self, max_size: int = DEFAULT_FONT_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._fonts = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, source: str, size: int):
+        key = (source, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.hits += 1
+                return font
+            self.misses += 1
+
+        # Load outside of the lock, so slow loads don't block other threads
+        font = ImageFont.truetype(source, size)
+
+        with self._lock:
+            self._fonts[key] = font
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > self.max_size:
+                self._fonts.popitem(last=False)
+        return font
+
+    def get_family(self, sources, size: int):
+        return {
+            style: self.get(source, size)
+            for style, source in zip(FONT_STYLES, sources)
+        }
+
+    def preload(self, sources, sizes):
+        for size in sizes:
+            for source in sources:
+                self.get(source, size)
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._fonts),
+                "max_size": self.max_size
+            }
+
+
+font_registry = FontRegistry()
+
+
+def get_font(source: str, size: int):
+    return font_registry.get(source, size)
+
+
+def get_font_family(sources, size: int):
+    """
+        Returns a dict of the 4 font styles (Regular, Italic, Bold,
+        Bold + Italic) loaded from `sources` at the given size.
+    """
+    if len(sources) < len(FONT_STYLES):
+        raise IndexError("Expected " + str(len(FONT_STYLES)) + " font files.")
+    return font_registry.get_family(sources, size)
+
+
+def preload_fonts(sources, sizes):
+    font_registry.preload(sources, sizes)
+
+
+def clear_font_cache():
+    font_registry.clear()
+    get_system_font_manager.cache_clear()
+
+
+def font_cache_info():
+    return font_registry.info()
+
+
+class FileFontManager(FontManager):
+    """
+        A pygments FontManager which loads the 4 font styles directly from
+        font files, without looking for any font installed on the system.
+    """
+
+    def __init__(self, font_paths, font_size: int = 14):
+        self.font_name = font_paths[0] if font_paths else ""
+        self.font_size = font_size
+        self.encoding = None
+        self.variable = False
+        self.fonts = get_font_family(font_paths, font_size)
+
+
+@lru_cache(maxsize=DEFAULT_FONT_CACHE_SIZE)
+def get_system_font_manager(font_name: str, font_size: int = 14):
+    """
+        Looks for a font installed on the system (using fc-list on Unix).
+        The lookup is only done once per (font name, size) and process.
+        Returns None if the font couldn't be found.
+    """
+    try:
+        return FontManager(font_name, font_size)
+    except (FontNotFound, OSError):
+        return None
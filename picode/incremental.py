@@ -0,0 +1,213 @@
+"""
+    Converts the successive versions of an edited code to pictures, drawing
+    only the lines which changed
+"""
+
+from difflib import SequenceMatcher
+from picode.engine import get_line_length
+from picode.picode import Renderer
+from picode.tokens import lex
+from picode.util import NoCodeNorFileName
+
+
+class IncrementalRenderer:
+    """
+        Converts the successive versions of a code (while it's being edited,
+        for instance) to pictures. The lines and the picture of the previous
+        version are kept: the lines of the new version are compared to them,
+        and only the lines which changed are drawn. The other ones are copied
+        from the previous picture, moved up or down if lines were removed or
+        added above them.
+
+        The language is guessed (if not given) from the first version only,
+        call `reset` to guess it again. The pictures returned are used to
+        build the next ones, so they must not be modified (copy them first).
+        The options are the ones of `picode.Renderer`.
+    """
+
+    def __init__(self, **options):
+        self.renderer = Renderer(**options)
+        self.reset()
+
+    def reset(self):
+        """
+            Forgets the previous version, so the next one is fully drawn.
+        """
+        self._lexer = None
+        self._file_path = None
+        self._lines = []
+        self._im = None
+        self._layout = None
+        self._hl_lines = set()
+        # Number of lines drawn by the last call to render
+        self.redrawn_lines = 0
+        # Numbers (starting at 1) of the lines of the last version which
+        # weren't in the previous one
+        self.changed_lines = []
+
+    def render(self,
+               code: str,
+               file_path: str = None,
+               highlight_changes: bool = False):
+        """
+            Returns the picture of a new version of the code. If
+            `highlight_changes` is True, the lines which weren't in the
+            previous version are highlighted instead of `lines_highlighted`.
+        """
+        if not code:
+            raise NoCodeNorFileName(
+                "Please provide a code or the path to a code file.")
+
+        if self._lexer is None or file_path != self._file_path:
+            self._lexer = self.renderer.get_lexer(code, file_path)
+            self._file_path = file_path
+            self._im = None
+
+        # The whole code is lexed again (unless it's cached), which is fast
+        # compared to drawing
+        tokens = lex(self._lexer, code)
+        formatter = self.renderer.formatter.with_line_number_chars(
+            len(str(tokens.nb_newlines)))
+        lines = formatter.split_lines(tokens)
+        max_line_length = max((get_line_length(line) for line in lines),
+                              default=0)
+
+        matches = (self._match_lines(lines) if self._im is not None else
+                   [None] * len(lines))
+        self.changed_lines = [
+            i + 1 for i, old in enumerate(matches) if old is None
+        ]
+        if highlight_changes:
+            formatter = formatter.with_hl_lines(
+                self.changed_lines if self._im is not None else [])
+
+        # When the width of the picture or of the line numbers changes, every
+        # line moves, so everything is drawn again
+        layout = (formatter.line_number_chars, max_line_length)
+        if self._im is None or layout != self._layout or not lines:
+            im = formatter.render_lines(lines)
+            self.redrawn_lines = len(lines)
+        else:
+            im = self._update(formatter, lines, matches, max_line_length)
+
+        self._lines = lines
+        self._im = im
+        self._layout = layout
+        self._hl_lines = formatter.hl_lines
+        return im
+
+    def _match_lines(self, lines):
+        """
+            Returns, for each line, the index of the same line in the previous
+            version, or None if it's a new line.
+        """
+        old_lines = self._lines
+        nb_old, nb_new = len(old_lines), len(lines)
+        # Most edits touch a single place, so the lines before and after it
+        # are matched first, and only the lines in between are compared
+        prefix = 0
+        while (prefix < min(nb_old, nb_new) and
+               old_lines[prefix] == lines[prefix]):
+            prefix += 1
+        suffix = 0
+        while (suffix < min(nb_old, nb_new) - prefix and
+               old_lines[nb_old - 1 - suffix] == lines[nb_new - 1 - suffix]):
+            suffix += 1
+
+        matches = (list(range(prefix)) + [None] * (nb_new - prefix - suffix) +
+                   list(range(nb_old - suffix, nb_old)))
+        matcher = SequenceMatcher(
+            None, [tuple(line) for line in old_lines[prefix:nb_old - suffix]],
+            [tuple(line) for line in lines[prefix:nb_new - suffix]],
+            autojunk=False)
+        for old, new, size in matcher.get_matching_blocks():
+            for i in range(size):
+                matches[prefix + new + i] = prefix + old + i
+        return matches
+
+    def _update(self, formatter, lines, matches, max_line_length):
+        nb_lines = len(lines)
+        nb_old_lines = len(self._lines)
+
+        def is_highlighted(lineno):
+            return lineno + 1 in formatter.hl_lines
+
+        def was_highlighted(lineno):
+            return lineno + 1 in self._hl_lines
+
+        # A line is copied if it's unchanged, as well as the line above it
+        # (whose glyphs may go over it) and if they're highlighted the same
+        # way. The line numbers stay in place, so the lines which didn't
+        # exist before are drawn to get their line number.
+        redraw = []
+        for i, old in enumerate(matches):
+            if old is None or is_highlighted(i) != was_highlighted(old):
+                copy = False
+            elif i == 0:
+                copy = old == 0
+            else:
+                copy = matches[i - 1] == old - 1 and is_highlighted(
+                    i - 1) == was_highlighted(old - 1)
+            if formatter.line_numbers and i >= nb_old_lines:
+                copy = False
+            redraw.append(not copy)
+        self.redrawn_lines = sum(redraw)
+
+        width, height = formatter.get_image_size(nb_lines, max_line_length)
+        code_width, _ = formatter.get_code_size(nb_lines, max_line_length)
+        right = formatter.margin + code_width - 1
+        # The lines which didn't move are already in place, as well as the
+        # margin above the code and the line numbers
+        im = self._im.crop((0, 0, width, height))
+        left = 0
+        if formatter.line_numbers:
+            left = (formatter.margin + formatter.image_pad +
+                    formatter.line_number_width - formatter.line_number_pad +
+                    1)
+
+        i = 0
+        while i < nb_lines:
+            end = i + 1
+            if redraw[i]:
+                while end < nb_lines and redraw[end]:
+                    end += 1
+                self._draw(formatter, im, lines, i, end, max_line_length,
+                           right)
+            else:
+                while (end < nb_lines and not redraw[end] and
+                       matches[end] == matches[end - 1] + 1):
+                    end += 1
+                if matches[i] != i:
+                    old_top = formatter.get_line_y(matches[i])
+                    old_bottom = formatter.get_line_y(matches[end - 1] + 1)
+                    im.paste(
+                        self._im.crop((left, old_top, width, old_bottom)),
+                        (left, formatter.get_line_y(i)))
+            i = end
+
+        # The margin below the code, which the glyphs of the last line may go
+        # over
+        if not redraw or not redraw[-1]:
+            self._draw(formatter, im, lines, nb_lines, nb_lines,
+                       max_line_length, right)
+        return im
+
+    def _draw(self, formatter, im, lines, first: int, end: int,
+              max_line_length: int, right: int):
+        """
+            Draws the lines [first, end[ onto `im`, and the margin below the
+            code if `end` is the last line.
+        """
+        nb_lines = len(lines)
+        top = formatter.get_line_y(first)
+        bottom = (formatter.get_line_y(end) if end < nb_lines else im.size[1])
+        tile, canvas = formatter.new_canvas(nb_lines, max_line_length, top,
+                                            bottom - top)
+        # The line above is drawn again, as its glyphs may go over these ones
+        previous = lines[first - 1:first] if first else []
+        formatter.draw_lines(canvas,
+                             previous + lines[first:end],
+                             first - len(previous),
+                             right,
+                             top=top)
+        im.paste(formatter.finish_canvas(tile, canvas), (0, top))
@@ -0,0 +1,225 @@
+"""
+    Reading of the code files: they're memory-mapped, their encoding is
+    sniffed from a BOM or their beginning, and they're measured from their
+    bytes
+"""
+
+import codecs
+import locale
+import mmap
+import os
+import re
+from picode.util import IncorrectFile
+
+# Only the beginning of the file is used to guess its encoding
+SNIFF_SIZE = 64 * 1024
+
+# Longest BOMs first, as the UTF-32 LE one starts with the UTF-16 LE one
+BOMS = ((codecs.BOM_UTF32_LE, "utf-32-le"), (codecs.BOM_UTF32_BE, "utf-32-be"),
+        (codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"),
+        (codecs.BOM_UTF16_BE, "utf-16-be"))
+
+# "# -*- coding: latin-1 -*-" or "# vim: set fileencoding=cp1252 :" (PEP 263),
+# in the first 2 lines
+coding_regex = re.compile(rb"^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)")
+
+# Encodings where every line break is a b"\n" byte, and whose characters can
+# be counted from the bytes
+_byte_measurable_encodings = {"utf-8", "ascii", "latin-1", "iso8859-1"}
+
+
+def _normalize(encoding: str):
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return None
+
+
+def sniff_encoding(prefix: bytes):
+    """
+        Returns the encoding of a file starting with `prefix`, and the length
+        of its BOM: the encoding of the BOM, or of a coding declaration, or
+        UTF-16 if most of the other bytes are null, UTF-8 if the prefix is
+        valid UTF-8, and else the encoding of the locale.
+    """
+    for bom, encoding in BOMS:
+        if prefix.startswith(bom):
+            return encoding, len(bom)
+
+    for line in prefix.split(b"\n", 2)[:2]:
+        match = coding_regex.match(line)
+        if match:
+            encoding = _normalize(match.group(1).decode("ascii"))
+            if encoding:
+                return encoding, 0
+
+    # Codes are mostly ASCII, whose characters have a null byte in UTF-16
+    if len(prefix) % 2 == 0:
+        even_nulls, odd_nulls = prefix[0::2].count(0), prefix[1::2].count(0)
+        if odd_nulls > len(prefix) // 4 and not even_nulls:
+            return "utf-16-le", 0
+        if even_nulls > len(prefix) // 4 and not odd_nulls:
+            return "utf-16-be", 0
+
+    try:
+        # The last character may be cut
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        pass
+
+    return _normalize(locale.getpreferredencoding(False)) or "utf-8", 0
+
+
+class CodeFile:
+    """
+        A code file, memory-mapped so it's decoded (see `read`) and measured
+        (see `measure`) straight from the file, without intermediate copies.
+        Use it as a context manager, or call `close`.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._code = None
+        self._map = None
+        self.replaced = False
+        try:
+            with open(file_path, "rb") as file:
+                if os.fstat(file.fileno()).st_size:
+                    self._map = mmap.mmap(file.fileno(),
+                                          0,
+                                          access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise IncorrectFile("Couldn't read the file '" + file_path + "': " +
+                                str(e))
+        self.encoding, self.bom_length = sniff_encoding(
+            self._map[:SNIFF_SIZE] if self._map is not None else b"")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    @property
+    def size(self):
+        return len(self._map) if self._map is not None else 0
+
+    def read(self):
+        """
+            Returns the code, with its line breaks converted to "\\n" as in
+            text files. The undecodable bytes are replaced, with a warning.
+        """
+        if self._code is not None:
+            return self._code
+        if self._map is None:
+            self._code = ""
+            return self._code
+
+        with memoryview(self._map) as view:
+            data = view[self.bom_length:]
+            try:
+                code = str(data, self.encoding)
+            except UnicodeDecodeError as e:
+                print("Warning: The file '" + self.file_path +
+                      "' isn't valid " + self.encoding + " (" + str(e) +
+                      "). Replacing the incorrect characters.")
+                code = str(data, self.encoding, "replace")
+                self.replaced = True
+            finally:
+                data.release()
+        if "\r" in code:
+            code = code.replace("\r\n", "\n").replace("\r", "\n")
+        self._code = code
+        return code
+
+    def measure(self, lexer=None):
+        """
+            Returns the number of lines and the length of the longest line
+            (once the tabs are expanded) of the code, as `measure_code` does.
+            UTF-8 and Latin-1 files are measured from their bytes with NumPy
+            (when it's installed): the lines and their characters are counted
+            in a few passes, and only the longest lines with tabs are decoded
+            again.
+        """
+        from picode.engine import TAB_SIZE, measure_code
+
+        # The undecodable bytes are replaced by characters of other lengths
+        self.read()
+        strip_all = lexer is not None and lexer.stripall
+        if (self._map is None or self.replaced or strip_all or
+                self.encoding not in _byte_measurable_encodings or
+                self._map.find(b"\r") != -1):
+            return measure_code(self.read(), lexer)
+        try:
+            import numpy
+        except ImportError:
+            return measure_code(self.read(), lexer)
+
+        data = numpy.frombuffer(self._map, dtype=numpy.uint8)
+        try:
+            return self._measure_bytes(numpy, data[self.bom_length:],
+                                       lexer is not None and lexer.stripnl,
+                                       TAB_SIZE)
+        finally:
+            # The map can't be closed while an array uses it
+            del data
+
+    def _measure_bytes(self, numpy, data, strip_newlines: bool, tab_size: int):
+        is_newline = data == ord("\n")
+        start, end = 0, len(data)
+        if strip_newlines:
+            not_newlines = numpy.flatnonzero(~is_newline)
+            if not len(not_newlines):
+                return 1, 0
+            start, end = int(not_newlines[0]), int(not_newlines[-1]) + 1
+        newlines = numpy.flatnonzero(is_newline[start:end]) + start
+        del is_newline
+
+        starts = numpy.concatenate(([start], newlines + 1))
+        ends = numpy.concatenate((newlines, [end]))
+        nb_lines = len(starts)
+        if nb_lines > 1 and starts[-1] == end:
+            # The code ends with a line break
+            nb_lines -= 1
+            starts, ends = starts[:-1], ends[:-1]
+
+        def count_per_line(is_counted):
+            positions = numpy.flatnonzero(is_counted) + start
+            return (numpy.searchsorted(positions, ends) -
+                    numpy.searchsorted(positions, starts))
+
+        code = data[start:end]
+        lengths = ends - starts
+        if self.encoding == "utf-8":
+            # The continuation bytes of the characters
+            lengths -= count_per_line((code & 0xC0) == 0x80)
+        tabs = count_per_line(code == ord("\t"))
+        if not tabs.any():
+            return nb_lines, int(lengths.max())
+
+        # A tab takes up to `tab_size` characters, so only the lines with
+        # tabs which may be the longest are decoded
+        max_line_length = int(lengths[tabs == 0].max(initial=0))
+        bounds = lengths + tabs * (tab_size - 1)
+        candidates = numpy.flatnonzero(bounds > max_line_length)
+        for i in candidates[numpy.argsort(-bounds[candidates], kind="stable")]:
+            if bounds[i] <= max_line_length:
+                break
+            line = str(data[starts[i]:ends[i]], self.encoding)
+            max_line_length = max(max_line_length,
+                                  len(line.expandtabs(tab_size)))
+        return nb_lines, max_line_length
+
+
+def read_code(file_path: str):
+    """
+        Returns the code of a file (see `CodeFile.read`).
+    """
+    with CodeFile(file_path) as file:
+        return file.read()
@@ -0,0 +1,248 @@
+"""
+    Cheap, cached detection of the programming language of a code
+"""
+
+import os
+import re
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from hashlib import sha1
+from threading import Lock
+from pygments import util
+from pygments.lexers import (LEXERS, find_lexer_class_by_name,
+                             find_lexer_class_for_filename, guess_lexer)
+from pygments.lexers import find_lexer_class as find_lexer_class_by_class_name
+from pygments.lexers.special import TextLexer
+from picode.util import IncorrectLanguage
+
+# Only the beginning of the code is used to guess its language
+DEFAULT_SAMPLE_SIZE = 4096
+DEFAULT_LEXER_CACHE_SIZE = 1024
+
+# "#!/usr/bin/env python3", "#!/bin/sh -e" or "#!python"
+shebang_regex = re.compile(r"#!\s*(?:\S*/)?(?:env\s+(?:-\S+\s+)*)?([^\s/]+)")
+
+_glob_chars = frozenset("*?[")
+
+
+class LexerCache:
+    """
+        A bounded LRU cache of the lexer classes detected for the codes.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_LEXER_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lexers = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            lexer_class = self._lexers.get(key)
+            if lexer_class is None:
+                self.misses += 1
+                return None
+            self._lexers.move_to_end(key)
+            self.hits += 1
+            return lexer_class
+
+    def put(self, key, lexer_class):
+        with self._lock:
+            self._lexers[key] = lexer_class
+            self._lexers.move_to_end(key)
+            while len(self._lexers) > self.max_size:
+                self._lexers.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._lexers.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._lexers),
+                "max_size": self.max_size
+            }
+
+
+lexer_cache = LexerCache()
+
+
+def find_lexer_class(language: str):
+    """
+        Returns the lexer class of a language alias, or raises
+        IncorrectLanguage.
+    """
+    try:
+        return find_lexer_class_by_name(language)
+    except util.ClassNotFound:
+        raise IncorrectLanguage(
+            "There is no lexer for the programming language '" + language +
+            "'.")
+
+
+@lru_cache(maxsize=None)
+def get_lexer(lexer_class, strip_all: bool = False):
+    """
+        Returns a lexer instance. Lexers don't keep any state between two
+        codes, so one instance per (lexer, options) is shared.
+    """
+    return lexer_class(stripall=strip_all)
+
+
+def get_lexer_by_language(language: str, strip_all: bool = False):
+    return get_lexer(find_lexer_class(language), strip_all)
+
+
+def preload_lexers(languages: list = None, strip_all: bool = False):
+    """
+        Loads the lexers of `languages` and compiles their rules. If
+        `languages` is None, every built-in lexer class is loaded instead,
+        as guessing the language of a code goes through all of them.
+    """
+    if languages is None:
+        for _, lexer_name, _, _, _ in LEXERS.values():
+            find_lexer_class_by_class_name(lexer_name)
+        return
+    for language in languages:
+        get_lexer_by_language(language, strip_all)
+
+
+def _from_shebang(code: str):
+    if not code.startswith("#!"):
+        return None
+    match = shebang_regex.match(code)
+    if not match:
+        return None
+    name = match.group(1).lower()
+    # python3.7 -> python3 -> python
+    for alias in (name, name.rstrip("0123456789."), name.rstrip("0123456789")):
+        try:
+            return find_lexer_class_by_name(alias)
+        except util.ClassNotFound:
+            continue
+    return None
+
+
+def _matches(name: str, pattern: str):
+    # Most patterns are "*.extension", which don't need a regex
+    if pattern.startswith("*") and not _glob_chars.intersection(pattern[1:]):
+        return name.endswith(pattern[1:])
+    if not _glob_chars.intersection(pattern):
+        return name == pattern
+    return fnmatchcase(name, pattern)
+
+
+def is_code_file_name(file_path: str):
+    """
+        Returns whether a built-in lexer is known for the name of a file,
+        without loading any lexer.
+    """
+    name = os.path.basename(file_path)
+    return any(
+        _matches(name, pattern)
+        for _, _, _, patterns, _ in LEXERS.values()
+        for pattern in patterns)
+
+
+def _from_file_name(file_path: str, sample: str):
+    """
+        Same as pygments' find_lexer_class_for_filename, but only loads the
+        lexers whose patterns match, and only looks for the lexers of the
+        plugins (whose lookup imports every installed plugin) if no built-in
+        lexer matches.
+    """
+    name = os.path.basename(file_path)
+    matches = []
+    for _, lexer_name, _, patterns, _ in LEXERS.values():
+        for pattern in patterns:
+            if _matches(name, pattern):
+                matches.append(
+                    (find_lexer_class_by_class_name(lexer_name), pattern))
+    if not matches:
+        return find_lexer_class_for_filename(file_path, sample)
+
+    def get_rating(match):
+        lexer_class, pattern = match
+        # Like pygments, explicit names are preferred to patterns
+        bonus = 0.5 if "*" not in pattern else 0
+        score = (lexer_class.analyse_text(sample)
+                 if sample else lexer_class.priority)
+        return score + bonus, lexer_class.__name__
+
+    return max(matches, key=get_rating)[0]
+
+
+def _from_candidates(sample: str, lexer_classes):
+    best_class, best_score = None, 0.0
+    for lexer_class in lexer_classes:
+        score = lexer_class.analyse_text(sample)
+        if score > best_score:
+            best_class, best_score = lexer_class, score
+    return best_class
+
+
+def _detect_lexer_class(code: str, file_path: str, allowed_classes: tuple,
+                        sample_size: int):
+    lexer_class = _from_shebang(code)
+    if lexer_class and (not allowed_classes or lexer_class in allowed_classes):
+        return lexer_class
+
+    sample = code[:sample_size]
+
+    if file_path:
+        lexer_class = _from_file_name(file_path, sample)
+        if lexer_class and (not allowed_classes or
+                            lexer_class in allowed_classes):
+            return lexer_class
+
+    if allowed_classes:
+        return _from_candidates(sample, allowed_classes) or allowed_classes[0]
+
+    return type(guess_lexer(sample))
+
+
+def detect_lexer(code: str,
+                 file_path: str = None,
+                 allowed_languages: list = None,
+                 strip_all: bool = False,
+                 sample_size: int = DEFAULT_SAMPLE_SIZE,
+                 stats=None):
+    """
+        Returns a lexer for the code, trying the cheap signals first:
+        the shebang (or a `#!language` header), the file extension, and then
+        the first `sample_size` characters of the code. Only the lexers of
+        `allowed_languages` are considered if it's given. The result is
+        cached by content. If a RenderStats is given, it records whether the
+        cache was used.
+    """
+    allowed_classes = tuple(
+        find_lexer_class(language) for language in allowed_languages or [])
+
+    key = (sha1(code.encode("utf-8", "surrogatepass")).digest(),
+           os.path.basename(file_path) if file_path else None, allowed_classes,
+           sample_size)
+
+    lexer_class = lexer_cache.get(key)
+    if stats is not None:
+        stats.lexer_cache_hit = lexer_class is not None
+    if lexer_class is None:
+        lexer_class = _detect_lexer_class(code, file_path, allowed_classes,
+                                          sample_size) or TextLexer
+        lexer_cache.put(key, lexer_class)
+
+    return get_lexer(lexer_class, strip_all)
+
+
+def clear_lexer_cache():
+    lexer_cache.clear()
+
+
+def lexer_cache_info():
+    return lexer_cache.info()
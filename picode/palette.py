@@ -0,0 +1,159 @@
+"""
+    Palettes of the pictures drawn in indexed colors (P mode)
+"""
+
+from PIL import Image, ImageColor
+from picode.encoders import NO_DITHER
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAX_COLORS = 256
+
+# Maximum number of shades between a text color and a background color, used
+# to draw the antialiased edges of the glyphs
+MAX_SHADES = 14
+
+
+def mix(fg, bg, t: float):
+    return tuple(round(b + (f - b) * t) for f, b in zip(fg, bg))
+
+
+class Palette:
+    """
+        A palette holding `colors` (the backgrounds and the text colors) and,
+        for each (text color, background color) of `pairs`, shades going
+        from the background to the text color. The shades are spread evenly,
+        as many as fit in 256 colors.
+    """
+
+    def __init__(self, colors, pairs):
+        self.colors = []
+        self.indices = {}
+        for color in colors:
+            self._add_color(ImageColor.getrgb(color)[:3])
+        if len(self.colors) > MAX_COLORS:
+            raise ValueError("There are more than " + str(MAX_COLORS) +
+                             " colors.")
+
+        pairs = sorted({(self.get_index(fg), self.get_index(bg))
+                        for fg, bg in pairs})
+        pairs = [(fg, bg) for fg, bg in pairs if fg != bg]
+        self.shades = (min(MAX_SHADES, (MAX_COLORS - len(self.colors)) //
+                           len(pairs)) if pairs else 0)
+        # The background and the level of shade of each color, plain colors
+        # being their own background
+        self.backgrounds = list(range(len(self.colors)))
+        self.levels = [0] * len(self.colors)
+        # The indices of the shades of each pair, the background first and
+        # the text color last
+        self.ramps = {}
+        for fg, bg in pairs:
+            ramp = [bg]
+            for level in range(1, self.shades + 1):
+                ramp.append(len(self.colors))
+                self.colors.append(
+                    mix(self.colors[fg], self.colors[bg],
+                        level / (self.shades + 1)))
+                self.backgrounds.append(bg)
+                self.levels.append(level)
+            ramp.append(fg)
+            self.ramps[fg, bg] = ramp
+
+        self.data = b"".join(bytes(color) for color in self.colors)
+        self._image = None
+        self._blend_tables = {}
+
+    def _add_color(self, rgb):
+        if rgb not in self.indices:
+            self.indices[rgb] = len(self.colors)
+            self.colors.append(rgb)
+
+    def get_index(self, color: str):
+        """
+            Returns the index of a color, or of the closest color of the
+            palette.
+        """
+        rgb = ImageColor.getrgb(color)[:3]
+        index = self.indices.get(rgb)
+        if index is None:
+            index = min(range(len(self.colors)),
+                        key=lambda i: sum(
+                            (a - b)**2 for a, b in zip(self.colors[i], rgb)))
+        return index
+
+    def get_image(self):
+        """
+            Returns a 1x1 picture holding the palette, as used by
+            `Image.quantize`.
+        """
+        if self._image is None:
+            im = Image.new("P", (1, 1))
+            im.putpalette(self.data)
+            self._image = im
+        return self._image
+
+    def reduce(self, im):
+        """
+            Converts an RGB picture to this palette, each pixel taking the
+            closest color.
+        """
+        return im.quantize(palette=self.get_image(), dither=NO_DITHER)
+
+    def get_blend_table(self, fg: int):
+        """
+            Returns a table giving, for each color of the palette and each
+            level of coverage (0 to shades + 1), the color obtained by drawing
+            the color `fg` over it. A pixel which already has a higher level
+            of another text color keeps it, and a color without shades to
+            `fg` is replaced by `fg` once half covered.
+        """
+        table = self._blend_tables.get(fg)
+        if table is not None:
+            return table
+        nb_levels = self.shades + 2
+        nb_colors = len(self.colors)
+        keep = numpy.repeat(
+            numpy.arange(nb_colors, dtype=numpy.uint8)[:, None], nb_levels, 1)
+        halfway = numpy.where(
+            numpy.arange(nb_levels) * 2 >= nb_levels - 1, fg,
+            -1).astype(numpy.int16)
+        ramps = [
+            self.ramps.get((fg, background), halfway)
+            for background in self.backgrounds
+        ]
+        ramps = numpy.array(ramps, dtype=numpy.int16)
+        levels = numpy.array(self.levels)[:, None]
+        update = ((numpy.arange(nb_levels)[None, :] > levels) & (ramps >= 0))
+        table = numpy.where(update, ramps, keep).astype(numpy.uint8)
+        self._blend_tables[fg] = table
+        return table
+
+
+def make_palette(formatter):
+    """
+        Returns the palette of the pictures drawn by a CanvasFormatter: its
+        backgrounds, the colors of its style, and the shades of each text
+        color over the backgrounds it's drawn on.
+    """
+    backgrounds = [
+        formatter.picture_background_color, formatter.background_color
+    ]
+    if formatter.hl_lines:
+        backgrounds.append(formatter.hl_color)
+    colors = list(backgrounds)
+    pairs = []
+    if formatter.line_numbers:
+        colors += [formatter.line_number_bg, formatter.line_number_fg]
+        pairs.append((formatter.line_number_fg, formatter.line_number_bg))
+
+    for ttype in formatter.styles:
+        _, fg, bg, _, _ = formatter.get_run_style(ttype)
+        colors.append(fg)
+        pairs += [(fg, background) for background in backgrounds[1:]]
+        if bg:
+            colors.append(bg)
+            pairs.append((fg, bg))
+    return Palette(colors, pairs)
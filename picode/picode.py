@@ -2,57 +2,500 @@
     A module to convert codes to pictures
 """
 
-import sys
-from argparse import ArgumentParser, FileType
-from PIL import Image, ImageFont, ImageDraw, ImageColor
-from pygments import highlight
-from pygments.lexers import guess_lexer, guess_lexer_for_filename, get_lexer_by_name
-from pygments.formatters import ImageFormatter
-from pygments.formatters.img import FontManager, FontNotFound
-from io import BytesIO
-from pygments.style import Style
-from pygments.token import Token
 from pygments import util
-from os.path import dirname, abspath
+from itertools import islice
 import os
 from picode.util import *
-
-__version__ = "1.1.1"
-
-fonts_dir = dirname(abspath(__file__))
-
-# Default configuration
-# ---------------------
-
-# Use monospaced font. Otherwise, the output would be horrible
-DEFAULT_FONT_NAME = "Hack"
-# Normal, Italic, Bold, BoldItalic
-DEFAULT_FONT_PATHS = (os.path.join(fonts_dir, "data/Hack-Regular.ttf"),
-                      os.path.join(fonts_dir, "data/Hack-Italic.ttf"),
-                      os.path.join(fonts_dir, "data/Hack-Bold.ttf"),
-                      os.path.join(fonts_dir, "data/Hack-BoldItalic.ttf"))
-
-DEFAULT_FONT_SIZE = 14
-DEFAULT_MARGIN = 30
-DEFAULT_PADDING = 10
-DEFAULT_SPACE_BETWEEN_LINES = 5
-DEFAULT_SHOW_LINE_NUMBERS = False
-DEFAULT_LINE_NUMBERS_PADDING = 10
-DEFAULT_CODE_BACKGROUND_COLOR = "#151718"
-DEFAULT_PICTURE_BACKGROUND_COLOR = "#A5B2BD"
-DEFAULT_LINE_NUMBERS_COLOR = "#6D8A88"
-DEFAULT_LINE_NUMBERS_BACKGROUND_COLOR = "#151718"
-DEFAULT_HIGHLIGHT_COLOR = "#F7F0AB"
-DEFAULT_LINE_NUMBERS_BOLD = False
-DEFAULT_LINE_NUMBERS_ITALIC = False
-DEFAULT_SHOW_LINE_NUMBERS_SEPARATOR = False
-DEFAULT_STRIP_ALL = False
-DEFAULT_STYLE = "monokai"
-
-# ---------------------
-
-DEFAULT_FONT_NAME_UNIX = "Bitstream Vera Sans Mono"
-DEFAULT_FONT_NAME_WIN = "Courier New"
+from picode.version import __version__
+from picode.defaults import *
+from picode.fonts import FileFontManager, get_system_font_manager
+from picode.engine import CanvasFormatter, DEFAULT_TILE_LINES, measure_code
+from picode.png import PNGWriter
+from picode.encoders import VECTOR_FORMATS, Encoder, get_format
+from picode.stats import (RenderStats, notify_render_hooks, render_hooks,
+                          stage)
+from picode.cache import make_key
+from picode.lexers import detect_lexer, find_lexer_class, get_lexer_by_language
+from picode.tokens import Tokens, lex
+
+
+class Renderer:
+    """
+        Converts codes to pictures using the same settings every time.
+        The settings are validated, and the fonts, style and lexer are
+        loaded once, when the renderer is created.
+    """
+
+    def __init__(
+            self,
+            language: str = None,
+            space_between_lines: int = DEFAULT_SPACE_BETWEEN_LINES,
+            font_name: str = None,
+            font_paths: list = [],
+            font_size: int = DEFAULT_FONT_SIZE,
+            padding: int = DEFAULT_PADDING,
+            show_line_numbers: bool = DEFAULT_SHOW_LINE_NUMBERS,
+            line_numbers_background_color:
+            str = DEFAULT_LINE_NUMBERS_BACKGROUND_COLOR,
+            line_numbers_color: str = DEFAULT_LINE_NUMBERS_COLOR,
+            show_line_numbers_bold: bool = DEFAULT_LINE_NUMBERS_BOLD,
+            show_line_numbers_italic: bool = DEFAULT_LINE_NUMBERS_ITALIC,
+            show_line_numbers_separator:
+            bool = DEFAULT_SHOW_LINE_NUMBERS_SEPARATOR,
+            line_numbers_padding: int = DEFAULT_LINE_NUMBERS_PADDING,
+            lines_highlighted: list = [],
+            highlight_color: str = DEFAULT_HIGHLIGHT_COLOR,
+            picture_background_color: str = DEFAULT_PICTURE_BACKGROUND_COLOR,
+            code_background_color: str = DEFAULT_CODE_BACKGROUND_COLOR,
+            margin: int = DEFAULT_MARGIN,
+            strip_all: bool = DEFAULT_STRIP_ALL,
+            style=DEFAULT_STYLE,
+            allowed_languages: list = None,
+            cache=None,
+            engine: str = DEFAULT_ENGINE,
+            encoding_preset: str = DEFAULT_PRESET,
+            compress_level: int = None,
+            quality: int = None,
+            palette_colors: int = None,
+            palette: bool = False,
+            embed_font: bool = DEFAULT_EMBED_FONT):
+
+        if font_name and font_paths:
+            raise ProvideFontNameOrFontPaths(
+                "Please provide a font name or the font paths but not both.")
+
+        if not font_name and not font_paths:
+            font_paths = DEFAULT_FONT_PATHS
+
+        if font_size < 1:
+            raise IncorrectFontSize("The font size must be >= 1.")
+
+        if engine not in ENGINES:
+            raise IncorrectEngine("There is no engine named '" + engine +
+                                  "'. The engines are: " + ", ".join(ENGINES) +
+                                  ".")
+
+        # NumPy is only loaded when the atlas engine is used
+        if engine == "atlas":
+            from picode import atlas
+        if engine == "atlas" and atlas.numpy is None:
+            print("Warning: The engine 'atlas' needs NumPy, which isn't "
+                  "installed. Using default engine.")
+            engine = DEFAULT_ENGINE
+
+        for color in (line_numbers_background_color, line_numbers_color,
+                      highlight_color, picture_background_color,
+                      code_background_color):
+            if not is_a_correct_hexadecimal_color(color):
+                raise IncorrectColor(color +
+                                     " is not a valid hexadecimal color.")
+
+        self.encoder = Encoder(encoding_preset, compress_level, quality,
+                               palette_colors)
+
+        self.language = language
+        self.strip_all = strip_all
+        self.allowed_languages = allowed_languages
+        self.cache = cache
+        self.embed_font = embed_font
+
+        # The settings in a normalized form, used to build the cache keys
+        self.options = {
+            "language": language,
+            "space_between_lines": space_between_lines,
+            "font_name": font_name,
+            "font_paths": tuple(font_paths),
+            "font_size": font_size,
+            "padding": padding,
+            "show_line_numbers": bool(show_line_numbers),
+            "line_numbers_background_color":
+            line_numbers_background_color.upper(),
+            "line_numbers_color": line_numbers_color.upper(),
+            "show_line_numbers_bold": bool(show_line_numbers_bold),
+            "show_line_numbers_italic": bool(show_line_numbers_italic),
+            "show_line_numbers_separator": bool(show_line_numbers_separator),
+            "line_numbers_padding": line_numbers_padding,
+            "lines_highlighted": tuple(sorted(set(lines_highlighted))),
+            "highlight_color": highlight_color.upper(),
+            "picture_background_color": picture_background_color.upper(),
+            "code_background_color": code_background_color.upper(),
+            "margin": margin,
+            "strip_all": bool(strip_all),
+            "style": style if isinstance(style, str) else
+                     style.__module__ + "." + style.__qualname__,
+            "allowed_languages": tuple(allowed_languages or ()),
+            "engine": engine,
+            "encoding_preset": encoding_preset,
+            "compress_level": compress_level,
+            "quality": quality,
+            "palette_colors": palette_colors,
+            "palette": bool(palette),
+            "embed_font": bool(embed_font)
+        }
+
+        self.lexer = None
+        if language:
+            self.lexer = get_lexer_by_language(language, strip_all)
+        elif allowed_languages:
+            # Checks the languages
+            for allowed_language in allowed_languages:
+                find_lexer_class(allowed_language)
+
+        # The fonts are loaded directly from the font files (the bundled Hack
+        # font by default), so no system font lookup is done. A system lookup
+        # is only done when a font name is given, once per process.
+        # -----------------------------------------------------------------------
+
+        font_manager = None
+        if font_name:
+            font_manager = get_system_font_manager(font_name, font_size)
+            if font_manager is None:
+                print("Warning: Couldn't find the font '" + font_name +
+                      "'. Using default font.")
+                font_manager = FileFontManager(DEFAULT_FONT_PATHS, font_size)
+        else:
+            try:
+                font_manager = FileFontManager(font_paths, font_size)
+            except (IndexError, OSError):
+                print(
+                    "Warning: Couldn't properly load the font files. Using default font."
+                )
+                font_manager = FileFontManager(DEFAULT_FONT_PATHS, font_size)
+
+        # -----------------------------------------------------------------------
+
+        # The formatter draws the code straight onto the final picture, margin
+        # included, so there is no intermediate picture to encode, decode and
+        # paste
+        formatter_options = dict(
+            margin=margin,
+            picture_background_color=picture_background_color,
+            background_color=code_background_color,
+            line_pad=space_between_lines,
+            image_pad=padding,
+            line_numbers=show_line_numbers,
+            line_number_start=1,
+            line_number_bg=line_numbers_background_color,
+            line_number_fg=line_numbers_color,
+            line_number_bold=show_line_numbers_bold,
+            line_number_italic=show_line_numbers_italic,
+            line_number_separator=show_line_numbers_separator,
+            line_number_pad=line_numbers_padding,
+            hl_lines=lines_highlighted,
+            hl_color=highlight_color,
+            palette=palette)
+
+        # In indexed colors, the atlas engine draws the palette indices
+        # directly, the pillow engine reduces its RGB pictures to the palette
+        formatter_class = CanvasFormatter
+        if engine == "atlas":
+            formatter_class = (atlas.PaletteFormatter
+                               if palette else atlas.AtlasFormatter)
+        try:
+            self.formatter = formatter_class(font_manager,
+                                             style=style,
+                                             **formatter_options)
+        except util.ClassNotFound:
+            print("Warning: Couldn't find the style '" + style +
+                  "'. Using default style.")
+            self.formatter = formatter_class(font_manager,
+                                             style=DEFAULT_STYLE,
+                                             **formatter_options)
+
+    def get_lexer(self, code: str, file_path: str = None, stats=None):
+        if self.lexer:
+            return self.lexer
+        return detect_lexer(code, file_path, self.allowed_languages,
+                            self.strip_all, stats=stats)
+
+    def tokenize(self, code: str, file_path: str = None, stats=None):
+        """
+            Returns the Tokens of the code, which are cached.
+        """
+        if not code:
+            raise NoCodeNorFileName(
+                "Please provide a code or the path to a code file.")
+
+        with stage(stats, "lexer"):
+            lexer = self.get_lexer(code, file_path, stats)
+        with stage(stats, "lexing"):
+            return lex(lexer, code, stats)
+
+    def _render_tokens(self, tokens: Tokens, stats: RenderStats):
+        formatter = self.formatter.with_line_number_chars(
+            len(str(tokens.nb_newlines)))
+
+        if stats is None:
+            return formatter.render(tokens)
+
+        stats.language = tokens.language
+        with stats.stage("layout"):
+            lines = formatter.split_lines(tokens)
+        with stats.stage("drawing"):
+            im = formatter.render_lines(lines)
+        stats.nb_tokens = len(tokens)
+        stats.nb_lines = len(lines)
+        stats.width, stats.height = im.size
+        return im
+
+    def _render(self, code: str, file_path: str, stats: RenderStats):
+        return self._render_tokens(self.tokenize(code, file_path, stats),
+                                   stats)
+
+    def render_tokens(self, tokens: Tokens, stats=None):
+        """
+            Returns the picture of a code already lexed by `picode.tokenize`,
+            so the same tokens can be drawn with several renderers.
+        """
+        if not tokens:
+            raise NoCodeNorFileName(
+                "Please provide a code or the path to a code file.")
+
+        if stats is None and render_hooks:
+            stats = RenderStats()
+        im = self._render_tokens(tokens, stats)
+        if stats is not None:
+            notify_render_hooks(stats)
+        return im
+
+    def render(self, code: str, file_path: str = None, stats=None):
+        """
+            Returns the picture of the code. If a RenderStats is given (or if
+            render hooks are registered), it's filled with statistics about
+            the conversion.
+        """
+        if stats is None and render_hooks:
+            stats = RenderStats()
+        im = self._render(code, file_path, stats)
+        if stats is not None:
+            notify_render_hooks(stats)
+        return im
+
+    def render_file(self, file_path: str, stats=None):
+        with stage(stats, "read"):
+            code = read_file(file_path)
+        return self.render(code, file_path, stats)
+
+    def render_stream(self,
+                      code: str,
+                      output,
+                      file_path: str = None,
+                      tile_lines: int = DEFAULT_TILE_LINES):
+        """
+            Writes the picture of the code to `output` (a path or a binary
+            file object) as a PNG picture. The picture is drawn and encoded
+            `tile_lines` lines at a time, so the memory used doesn't depend on
+            the length of the code.
+        """
+        if not code:
+            raise NoCodeNorFileName(
+                "Please provide a code or the path to a code file.")
+
+        lexer = self.get_lexer(code, file_path)
+        self._render_stream(code, lexer, measure_code(code, lexer), output,
+                            tile_lines)
+
+    def _render_stream(self, code: str, lexer, size: tuple, output,
+                       tile_lines: int):
+        nb_lines, max_line_length = size
+        formatter = self.formatter.with_line_number_chars(len(str(nb_lines)))
+        lines = formatter.iter_lines(lexer.get_tokens(code))
+        width, height = formatter.get_image_size(nb_lines, max_line_length)
+        # The strips are encoded one by one, so they can't share a palette
+        compress_level = self.encoder.get_settings("PNG").get(
+            "compress_level", 6)
+        palette = formatter.palette
+        with PNGWriter(output,
+                       width,
+                       height,
+                       mode="P" if palette else "RGB",
+                       palette=palette.data if palette else None,
+                       compress_level=compress_level) as writer:
+            for tile in formatter.iter_tiles(lines, nb_lines, max_line_length,
+                                             tile_lines):
+                writer.write(tile)
+
+    def render_file_stream(self,
+                           file_path: str,
+                           output,
+                           tile_lines: int = DEFAULT_TILE_LINES):
+        """
+            Same as `render_stream`, the file being memory-mapped and
+            measured from its bytes (see `picode.ingest.CodeFile`).
+        """
+        from picode.ingest import CodeFile
+
+        with CodeFile(file_path) as file:
+            code = file.read()
+            if not code:
+                raise NoCodeNorFileName(
+                    "Please provide a code or the path to a code file.")
+            lexer = self.get_lexer(code, file_path)
+            size = file.measure(lexer)
+        self._render_stream(code, lexer, size, output, tile_lines)
+
+    def render_pages(self,
+                     code: str,
+                     max_lines_per_image: int,
+                     file_path: str = None):
+        """
+            Yields pictures of at most `max_lines_per_image` lines of the
+            code, one after the other. The lines are highlighted as the code
+            goes, so only one page is in memory at a time.
+        """
+        if not code:
+            raise NoCodeNorFileName(
+                "Please provide a code or the path to a code file.")
+
+        if max_lines_per_image < 1:
+            raise IncorrectMaxLinesPerImage(
+                "The maximum number of lines per image must be >= 1.")
+
+        lexer = self.get_lexer(code, file_path)
+        nb_lines, _ = measure_code(code, lexer)
+        return self._render_pages(code, lexer, nb_lines, max_lines_per_image)
+
+    def _render_pages(self, code: str, lexer, nb_lines: int,
+                      max_lines_per_image: int):
+        formatter = self.formatter.with_line_number_chars(len(str(nb_lines)))
+        lines = formatter.iter_lines(lexer.get_tokens(code))
+        first_lineno = 0
+        while True:
+            page = list(islice(lines, max_lines_per_image))
+            if not page:
+                return
+            yield formatter.render_lines(page, first_lineno)
+            first_lineno += len(page)
+
+    def render_file_pages(self, file_path: str, max_lines_per_image: int):
+        from picode.ingest import CodeFile
+
+        if max_lines_per_image < 1:
+            raise IncorrectMaxLinesPerImage(
+                "The maximum number of lines per image must be >= 1.")
+        with CodeFile(file_path) as file:
+            code = file.read()
+            if not code:
+                raise NoCodeNorFileName(
+                    "Please provide a code or the path to a code file.")
+            lexer = self.get_lexer(code, file_path)
+            nb_lines, _ = file.measure(lexer)
+        return self._render_pages(code, lexer, nb_lines, max_lines_per_image)
+
+    def iter_svg(self, code: str, file_path: str = None):
+        """
+            Yields the SVG picture of the code as strings, written as the
+            code is highlighted. The layout is the one of the other pictures,
+            and the font is embedded unless `embed_font` is False (see
+            `picode.svg.SVGWriter`).
+        """
+        if not code:
+            raise NoCodeNorFileName(
+                "Please provide a code or the path to a code file.")
+
+        lexer = self.get_lexer(code, file_path)
+        return self._iter_svg(code, lexer, measure_code(code, lexer))
+
+    def _iter_svg(self, code: str, lexer, size: tuple):
+        from picode.svg import SVGWriter
+
+        nb_lines, max_line_length = size
+        # Sized from the measure, as the other pictures of the code
+        formatter = self.formatter.with_line_number_chars(
+            len(str(nb_lines + self.formatter.line_number_start - 1)))
+        writer = SVGWriter(formatter, self.embed_font)
+        return writer.iter_svg(formatter.iter_lines(lexer.get_tokens(code)),
+                               nb_lines, max_line_length)
+
+    def render_svg(self, code: str, file_path: str = None):
+        return "".join(self.iter_svg(code, file_path))
+
+    def render_file_svg(self, file_path: str, output):
+        """
+            Writes the SVG picture of a file to `output` (a path or a binary
+            file object) as it's written, the file being read as in
+            `render_file_stream`.
+        """
+        from picode.ingest import CodeFile
+
+        with CodeFile(file_path) as file:
+            code = file.read()
+            if not code:
+                raise NoCodeNorFileName(
+                    "Please provide a code or the path to a code file.")
+            lexer = self.get_lexer(code, file_path)
+            size = file.measure(lexer)
+        chunks = self._iter_svg(code, lexer, size)
+        if isinstance(output, str):
+            with open(output, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk.encode("utf-8"))
+        else:
+            for chunk in chunks:
+                output.write(chunk.encode("utf-8"))
+
+    def render_bytes(self,
+                     code: str,
+                     file_path: str = None,
+                     image_format: str = "PNG",
+                     stats=None):
+        """
+            Returns the picture encoded in `image_format`. If the renderer
+            has a cache, an already encoded picture is returned without
+            rendering the code again.
+        """
+        if not code:
+            raise NoCodeNorFileName(
+                "Please provide a code or the path to a code file.")
+
+        if stats is None and render_hooks:
+            stats = RenderStats()
+
+        key = None
+        if self.cache is not None:
+            with stage(stats, "cache"):
+                key = make_key(
+                    code,
+                    os.path.basename(file_path) if file_path else None,
+                    self.options, image_format)
+                data = self.cache.get(key)
+            if stats is not None:
+                stats.cache_hit = data is not None
+            if data is not None:
+                if stats is not None:
+                    notify_render_hooks(stats)
+                return data
+
+        if get_format(image_format) in VECTOR_FORMATS:
+            with stage(stats, "drawing"):
+                data = self.render_svg(code, file_path).encode("utf-8")
+        else:
+            im = self._render(code, file_path, stats)
+            with stage(stats, "encode"):
+                data = self.encoder.encode(im, image_format)
+
+        if self.cache is not None:
+            with stage(stats, "cache"):
+                self.cache.put(key, data)
+        if stats is not None:
+            notify_render_hooks(stats)
+        return data
+
+    def save(self, im, file, image_format: str = None):
+        """
+            Writes a picture to `file` (a path or a binary file object) with
+            the encoding settings of the renderer. The format is guessed from
+            the extension of the path if not given.
+        """
+        self.encoder.save(im, file, image_format)
+
+    def render_file_bytes(self,
+                          file_path: str,
+                          image_format: str = "PNG",
+                          stats=None):
+        with stage(stats, "read"):
+            code = read_file(file_path)
+        return self.render_bytes(code, file_path, image_format, stats)
 
 
 def to_pic(
@@ -78,7 +521,10 @@ def to_pic(
         code_background_color: str = DEFAULT_CODE_BACKGROUND_COLOR,
         margin: int = DEFAULT_MARGIN,
         strip_all: bool = DEFAULT_STRIP_ALL,
-        style=DEFAULT_STYLE):
+        style=DEFAULT_STYLE,
+        allowed_languages: list = None,
+        engine: str = DEFAULT_ENGINE,
+        stats=None):
 
     if not code and not file_path:
         raise NoCodeNorFileName(
@@ -88,391 +534,98 @@ def to_pic(
         raise ProvideCodeOrFileName(
             "Please provide a code or a file name but not both.")
 
-    if font_name and font_paths:
-        raise ProvideFontNameOrFontPaths(
-            "Please provide a font name or the font paths but not both.")
-
-    if not font_name and not font_paths:
-        font_paths = DEFAULT_FONT_PATHS
-
-    if font_size < 1:
-        raise IncorrectFontSize("The font size must be >= 1.")
-
-    if not is_a_correct_hexadecimal_color(line_numbers_background_color):
-        raise IncorrectColor(line_numbers_background_color +
-                             " is not a valid hexadecimal color.")
+    with stage(stats, "setup"):
+        renderer = Renderer(
+            language=language,
+            space_between_lines=space_between_lines,
+            font_name=font_name,
+            font_paths=font_paths,
+            font_size=font_size,
+            padding=padding,
+            show_line_numbers=show_line_numbers,
+            line_numbers_background_color=line_numbers_background_color,
+            line_numbers_color=line_numbers_color,
+            show_line_numbers_bold=show_line_numbers_bold,
+            show_line_numbers_italic=show_line_numbers_italic,
+            show_line_numbers_separator=show_line_numbers_separator,
+            line_numbers_padding=line_numbers_padding,
+            lines_highlighted=lines_highlighted,
+            highlight_color=highlight_color,
+            picture_background_color=picture_background_color,
+            code_background_color=code_background_color,
+            margin=margin,
+            strip_all=strip_all,
+            style=style,
+            allowed_languages=allowed_languages,
+            engine=engine)
 
-    if not is_a_correct_hexadecimal_color(line_numbers_color):
-        raise IncorrectColor(
-            line_numbers_color + " is not a valid hexadecimal color.")
-
-    if not is_a_correct_hexadecimal_color(highlight_color):
-        raise IncorrectColor(
-            highlight_color + " is not a valid hexadecimal color.")
-
-    if not is_a_correct_hexadecimal_color(picture_background_color):
-        raise IncorrectColor(
-            picture_background_color + " is not a valid hexadecimal color.")
+    if file_path:
+        return renderer.render_file(file_path, stats)
+    return renderer.render(code, stats=stats)
+
+
+def render_tokens(tokens: Tokens, stats=None, **options):
+    """
+        Returns the picture of a code lexed by `picode.tokenize`. The options
+        are the ones of `picode.Renderer` (the language options aren't used).
+    """
+    with stage(stats, "setup"):
+        renderer = Renderer(**options)
+    return renderer.render_tokens(tokens, stats)
+
+
+def to_bytes(code: str = None,
+             file_path: str = None,
+             image_format: str = "PNG",
+             cache=None,
+             stats=None,
+             **options):
+    """
+        Same as `to_pic`, but returns the picture encoded in `image_format`.
+        If a cache (picode.cache.MemoryCache or picode.cache.DiskCache) is
+        given, the pictures are stored in it and codes which were already
+        converted with the same options aren't rendered again.
+    """
+    if not code and not file_path:
+        raise NoCodeNorFileName(
+            "Please provide a code or the path to a code file.")
 
-    if not is_a_correct_hexadecimal_color(code_background_color):
-        raise IncorrectColor(
-            code_background_color + " is not a valid hexadecimal color.")
+    if code and file_path:
+        raise ProvideCodeOrFileName(
+            "Please provide a code or a file name but not both.")
 
-    lexer = None
+    with stage(stats, "setup"):
+        renderer = Renderer(cache=cache, **options)
 
     if file_path:
-        with open(file_path, "r") as file:
-            code = file.read()
-        if language:
-            try:
-                lexer = get_lexer_by_name(language, stripall=strip_all)
-            except util.ClassNotFound:
-                raise IncorrectLanguage(
-                    "There is no lexer for the programming language '" +
-                    language + "'.")
-        else:
-            lexer = guess_lexer_for_filename(file_path, code)
+        return renderer.render_file_bytes(file_path, image_format, stats)
+    return renderer.render_bytes(code, image_format=image_format, stats=stats)
 
-    nb_lines = code.count("\n")
 
-    if not lexer:
-        if language:
-            try:
-                lexer = get_lexer_by_name(language, stripall=strip_all)
-            except util.ClassNotFound:
-                raise IncorrectLanguage(
-                    "There is no lexer for the programming language '" +
-                    language + "'.")
-        else:
-            lexer = guess_lexer(code, stripall=strip_all)
+def to_svg(code: str = None, file_path: str = None, stats=None, **options):
+    """
+        Same as `to_pic`, but returns the SVG picture of the code as a
+        string, without rasterizing it. The options are the ones of
+        `picode.Renderer`: with `embed_font=False`, the font is referenced
+        by its name instead of being embedded.
+    """
+    if not code and not file_path:
+        raise NoCodeNorFileName(
+            "Please provide a code or the path to a code file.")
 
-    formatter = None
-    try:
-        formatter = ImageFormatter(
-            image_format="PNG",
-            line_pad=space_between_lines,
-            image_pad=padding,
-            line_numbers=show_line_numbers,
-            line_number_start=1,
-            line_number_step=1,
-            line_number_bg=line_numbers_background_color,
-            line_number_fg=line_numbers_color,
-            line_number_chars=len(str(nb_lines)),
-            line_number_bold=show_line_numbers_bold,
-            line_number_italic=show_line_numbers_italic,
-            line_number_separator=show_line_numbers_separator,
-            line_number_pad=line_numbers_padding,
-            hl_lines=lines_highlighted,
-            hl_color=highlight_color,
-            style=style)
-    except util.ClassNotFound:
-        print("Warning: Couldn't find the style '" + style +
-              "'. Using default style.")
-        formatter = ImageFormatter(
-            image_format="PNG",
-            line_pad=space_between_lines,
-            image_pad=padding,
-            line_numbers=show_line_numbers,
-            line_number_start=1,
-            line_number_step=1,
-            line_number_bg=line_numbers_background_color,
-            line_number_fg=line_numbers_color,
-            line_number_chars=len(str(nb_lines)),
-            line_number_bold=show_line_numbers_bold,
-            line_number_italic=show_line_numbers_italic,
-            line_number_separator=show_line_numbers_separator,
-            line_number_pad=line_numbers_padding,
-            hl_lines=lines_highlighted,
-            hl_color=highlight_color,
-            style=DEFAULT_STYLE)
-    formatter.background_color = to_int(code_background_color)
-
-    # This is a tricky thing below
-    # As we can't provide a font file path to instantiate a FontManager, I
-    # improved Font Manger behavior manually. This allows us to use fonts
-    # which are not natively installed on the device.
-    # See https://github.com/nex3/pygments/blob/master/pygments/formatters/img.py
-    # ---------------------------------------------------------------------------
-
-    # Let's create a correct font manager, which can handle already installed
-    # fonts but also files from files
-    font_manager = None
-    if font_name:
-        try:
-            font_manager = FontManager(font_name, font_size)
-        except FontNotFound:
-            print("Warning: Couldn't find the font '" + font_name +
-                  "'. Using default font.")
-            font_manager = FontManager(
-                DEFAULT_FONT_NAME_WIN if sys.platform.startswith("win") else
-                DEFAULT_FONT_NAME_UNIX, font_size)
-            font_manager.fonts = {
-                "NORMAL": ImageFont.truetype(DEFAULT_FONT_PATHS[0], font_size),
-                "ITALIC": ImageFont.truetype(DEFAULT_FONT_PATHS[1], font_size),
-                "BOLD": ImageFont.truetype(DEFAULT_FONT_PATHS[2], font_size),
-                "BOLDITALIC": ImageFont.truetype(DEFAULT_FONT_PATHS[3],
-                                                 font_size)
-            }
-    else:
-        try:
-            font_manager = FontManager(
-                DEFAULT_FONT_NAME_WIN if sys.platform.startswith("win") else
-                DEFAULT_FONT_NAME_UNIX, font_size)
-            font_manager.fonts = {
-                "NORMAL": ImageFont.truetype(font_paths[0], font_size),
-                "ITALIC": ImageFont.truetype(font_paths[1], font_size),
-                "BOLD": ImageFont.truetype(font_paths[2], font_size),
-                "BOLDITALIC": ImageFont.truetype(font_paths[3], font_size)
-            }
-        except (IndexError, OSError):
-            print(
-                "Warning: Couldn't properly load the font files. Using default font."
-            )
-            font_manager.fonts = {
-                "NORMAL": ImageFont.truetype(DEFAULT_FONT_PATHS[0], font_size),
-                "ITALIC": ImageFont.truetype(DEFAULT_FONT_PATHS[1], font_size),
-                "BOLD": ImageFont.truetype(DEFAULT_FONT_PATHS[2], font_size),
-                "BOLDITALIC": ImageFont.truetype(DEFAULT_FONT_PATHS[3],
-                                                 font_size)
-            }
-
-    # Now, let's set this new font manager to our formatter and adapt font width and height
-    formatter.fonts = font_manager
-    formatter.fontw, formatter.fonth = font_manager.get_char_size()
-
-    # ---------------------------------------------------------------------------
-
-    result = highlight(code, lexer, formatter)
-
-    code_image = Image.open(BytesIO(result))
-    code_width, code_height = code_image.size
-
-    im = Image.new(
-        "RGB", (margin * 2 + code_width, margin * 2 + code_height),
-        color=to_int(picture_background_color))
-
-    im.paste(code_image,
-             (margin, margin, margin + code_width, margin + code_height))
-
-    return im
-
-
-def main(argv):
-
-    parser = ArgumentParser(
-        prog="picode",
-        description="A tool to convert codes to pictures.",
-        epilog="Version " + __version__)
-
-    parser.add_argument(
-        "-v",
-        "--version",
-        action="store_true",
-        help="Shows version number and exit.")
-
-    parser.add_argument(
-        "files",
-        nargs="*",
-        help="Path to the file which is gonna be converted to picture.")
-
-    parser.add_argument(
-        "-o",
-        "--output",
-        nargs="*",
-        metavar="output_file_name",
-        help=
-        "Specifies the names of the output pictures. No spaces in the names.")
-
-    parser.add_argument(
-        "-l",
-        "--language",
-        help="Specifies the programming language of the file.")
-
-    parser.add_argument(
-        "-sbl",
-        "--space-between-lines",
-        type=int,
-        help="Specifies the space between each line.")
-
-    parser.add_argument(
-        "-fn",
-        "--font-name",
-        help=
-        "Specifies the name of the font which is gonna be used for the picture. Use a monospaced font in order to get a decent result."
-    )
-
-    parser.add_argument(
-        "-fp",
-        "--font-paths",
-        nargs=4,
-        metavar=("Regular", "Italic", "Bold", "Italic+Bold"),
-        help=
-        "Specifies the paths of the font files which are gonna be used for the picture. The order is Regular, Italic, Bold, Bold + Italic. Use a monospaced font in order to get a decent result."
-    )
-
-    parser.add_argument(
-        "-fs",
-        "--font-size",
-        type=int,
-        help="Specifies the font size for the picture.")
-
-    parser.add_argument(
-        "-p", "--padding", type=int, help="Specifies the padding.")
-
-    parser.add_argument(
-        "-sln",
-        "--show-line-numbers",
-        action="store_true",
-        help="Specifies if the line numbers must be shown or not.")
-
-    parser.add_argument(
-        "-lnbc",
-        "--line-numbers-background-color",
-        help="Specifies the background color for the line numbers.")
-
-    parser.add_argument(
-        "-lnc",
-        "--line-numbers-color",
-        help="Specifies the color of the line numbers.")
-
-    parser.add_argument(
-        "-slnb",
-        "--show-line-numbers-bold",
-        action="store_true",
-        help="Specifies if the line numbers must be displayed in bold or not.")
-
-    parser.add_argument(
-        "-slni",
-        "--show-line-numbers-italic",
-        action="store_true",
-        help="Specifies if the line numbers must be displayed in italic or not."
-    )
-
-    parser.add_argument(
-        "-slns",
-        "--show-line-numbers-separator",
-        action="store_true",
-        help=
-        "Specifies if a separator between the line numbers and the code must be displayed or not."
-    )
-
-    parser.add_argument(
-        "-lnp",
-        "--line-numbers-padding",
-        type=int,
-        help="Specifies the padding between the code and the line numbers.")
-
-    parser.add_argument(
-        "-lh",
-        "--lines-highlighted",
-        nargs="*",
-        metavar="line-number",
-        type=int,
-        help="Specifies the lines which must be highlighted.")
-
-    parser.add_argument(
-        "-hc",
-        "--highlight-color",
-        help="Specifies the color for the highlighted lines.")
-
-    parser.add_argument(
-        "-pbc",
-        "--picture-background-color",
-        help="Specifies the background color of the picture.")
-
-    parser.add_argument(
-        "-cbc",
-        "--code-background-color",
-        help="Specifies the background color of the code.")
-
-    parser.add_argument(
-        "-m",
-        "--margin",
-        type=int,
-        help=
-        "Specifies the margin between the code and the border of the picture.")
-
-    parser.add_argument(
-        "-sa",
-        "--strip-all",
-        action="store_true",
-        help="Specifies if the code must be stripped or not.")
-
-    parser.add_argument(
-        "-s",
-        "--style",
-        help="Specifies the style which must be used for the picture.")
-
-    args = parser.parse_args(argv[1:])
-
-    if args.version:
-        print(__version__)
-        return 0
-
-    if not args.files:
-        print("No files were provided. Nothing to do.")
-        return 0
-
-    files = args.files
-    output_files = args.output if args.output else []
-
-    code_background_color = args.code_background_color if args.code_background_color else DEFAULT_CODE_BACKGROUND_COLOR
-    font_name = args.font_name if args.font_name else None
-    font_paths = args.font_paths if args.font_paths else []
-    font_size = args.font_size if args.font_size else DEFAULT_FONT_SIZE
-    highlight_color = args.highlight_color if args.highlight_color else DEFAULT_HIGHLIGHT_COLOR
-    language = args.language if args.language else None
-    line_numbers_background_color = args.line_numbers_background_color if args.line_numbers_background_color else DEFAULT_LINE_NUMBERS_BACKGROUND_COLOR
-    line_numbers_color = args.line_numbers_color if args.line_numbers_color else DEFAULT_LINE_NUMBERS_COLOR
-    line_numbers_padding = args.line_numbers_padding if args.line_numbers_padding else DEFAULT_LINE_NUMBERS_PADDING
-    lines_highlighted = args.lines_highlighted if args.lines_highlighted else []
-    margin = args.margin if args.margin else DEFAULT_MARGIN
-    padding = args.padding if args.padding else DEFAULT_PADDING
-    picture_background_color = args.picture_background_color if args.picture_background_color else DEFAULT_PICTURE_BACKGROUND_COLOR
-    show_line_numbers = args.show_line_numbers
-    show_line_numbers_bold = args.show_line_numbers_bold
-    show_line_numbers_italic = args.show_line_numbers_italic
-    show_line_numbers_separator = args.show_line_numbers_separator
-    space_between_lines = args.space_between_lines if args.space_between_lines else DEFAULT_SPACE_BETWEEN_LINES
-    strip_all = args.strip_all
-    style = args.style if args.style else DEFAULT_STYLE
-
-    for i, file in enumerate(files):
-        try:
-            im = to_pic(
-                file_path=file,
-                language=language,
-                space_between_lines=space_between_lines,
-                font_name=font_name,
-                font_paths=font_paths,
-                font_size=font_size,
-                padding=padding,
-                show_line_numbers=show_line_numbers,
-                line_numbers_background_color=line_numbers_background_color,
-                line_numbers_color=line_numbers_color,
-                show_line_numbers_bold=show_line_numbers_bold,
-                show_line_numbers_italic=show_line_numbers_italic,
-                show_line_numbers_separator=show_line_numbers_separator,
-                line_numbers_padding=line_numbers_padding,
-                lines_highlighted=lines_highlighted,
-                highlight_color=highlight_color,
-                picture_background_color=picture_background_color,
-                code_background_color=code_background_color,
-                margin=margin,
-                strip_all=strip_all,
-                style=style)
-        except PicodeException as e:
-            print("Error n°" + str(e.error_code) + " : " + e.message)
-            return e.error_code
-        try:
-            im.save(output_files[i])
-        except IndexError:
-            im.save(file[:file.rfind(".")] + ".png")
+    if code and file_path:
+        raise ProvideCodeOrFileName(
+            "Please provide a code or a file name but not both.")
 
+    with stage(stats, "setup"):
+        renderer = Renderer(**options)
 
-def run_main():
-    sys.exit(main(sys.argv))
+    if file_path:
+        with stage(stats, "read"):
+            code = read_file(file_path)
+    with stage(stats, "drawing"):
+        return renderer.render_svg(code, file_path)
 
 
-if __name__ == "__main__":
-    run_main()
+# The command-line tool moved to picode.cli, it's still available from here
+from picode.cli import main, run_main
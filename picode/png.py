@@ -0,0 +1,102 @@
+"""
+    A PNG writer which encodes a picture strip by strip, so the whole
+    picture never has to be in memory
+"""
+
+import struct
+import zlib
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Color type and bytes per pixel of the supported modes
+PNG_MODES = {"RGB": (2, 3), "P": (3, 1), "L": (0, 1)}
+
+# Size of the IDAT chunks written while encoding
+IDAT_SIZE = 256 * 1024
+
+
+class PNGWriter:
+    """
+        Writes a `width` x `height` PNG picture to `file` (a path or a binary
+        file object). The rows are given as strips of the same width with
+        `write`, from top to bottom.
+    """
+
+    def __init__(self,
+                 file,
+                 width: int,
+                 height: int,
+                 mode: str = "RGB",
+                 palette: bytes = None,
+                 compress_level: int = 6):
+        if mode not in PNG_MODES:
+            raise ValueError("Can't write a PNG picture in mode " + mode)
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.rows = 0
+        self._own_file = isinstance(file, str)
+        self._file = open(file, "wb") if self._own_file else file
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = []
+        self._pending_size = 0
+
+        color_type, self._pixel_size = PNG_MODES[mode]
+        self._file.write(PNG_SIGNATURE)
+        self._write_chunk(
+            b"IHDR",
+            struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+        if mode == "P":
+            self._write_chunk(b"PLTE", palette)
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes):
+        self._file.write(struct.pack(">I", len(data)))
+        self._file.write(chunk_type)
+        self._file.write(data)
+        self._file.write(
+            struct.pack(">I",
+                        zlib.crc32(data, zlib.crc32(chunk_type)) & 0xFFFFFFFF))
+
+    def _add_data(self, data: bytes, flush: bool = False):
+        if data:
+            self._pending.append(data)
+            self._pending_size += len(data)
+        if self._pending_size >= IDAT_SIZE or (flush and self._pending):
+            self._write_chunk(b"IDAT", b"".join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+
+    def write(self, strip):
+        """
+            Encodes the rows of `strip`, a PIL picture in the writer's mode.
+        """
+        if strip.size[0] != self.width:
+            raise ValueError("The strip must be " + str(self.width) +
+                             " pixels wide.")
+        if strip.mode != self.mode:
+            strip = strip.convert(self.mode)
+        data = strip.tobytes()
+        stride = self.width * self._pixel_size
+        # Each row starts with its filter type, 0 meaning no filter
+        rows = b"".join(
+            b"\0" + data[i:i + stride] for i in range(0, len(data), stride))
+        self.rows += strip.size[1]
+        self._add_data(self._compressor.compress(rows))
+
+    def close(self):
+        if self.rows != self.height:
+            raise ValueError("Wrote " + str(self.rows) + " rows instead of " +
+                             str(self.height) + ".")
+        self._add_data(self._compressor.flush(), flush=True)
+        self._write_chunk(b"IEND", b"")
+        if self._own_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._own_file:
+            self._file.close()
@@ -0,0 +1,63 @@
+"""
+    Loads what the conversions need ahead of time, so that servers can do it
+    once before forking their workers
+"""
+
+import gc
+from picode.defaults import DEFAULT_ENGINE, DEFAULT_FONT_SIZE, DEFAULT_STYLE
+from picode.lexers import preload_lexers
+
+# Drawn by every warmed up renderer, so the glyphs of the printable ASCII
+# characters are cached by the atlas engine
+WARMUP_CODE = "".join(map(chr, range(33, 127))) + "\n"
+
+
+def warmup(styles: list = None,
+           languages: list = None,
+           font_sizes: list = None,
+           engines: list = None,
+           image_formats: list = ["PNG"],
+           freeze: bool = True,
+           **options):
+    """
+        Loads the fonts at each of `font_sizes`, the `styles`, the lexers of
+        `languages` (every lexer class if None, see `preload_lexers`), the
+        `engines` and the Pillow plugins of `image_formats`, by converting a
+        short code with each combination. The other options are the ones of
+        `picode.Renderer`. All of this is kept in process-wide caches.
+
+        If `freeze` is True, the objects loaded so far are then left out of
+        the garbage collection (`gc.freeze`): processes forked afterwards
+        share them, instead of copying their memory pages as soon as the
+        collector goes through them.
+    """
+    from picode.picode import Renderer
+
+    # Used when the lists aren't given, and never passed twice to Renderer
+    style = options.pop("style", DEFAULT_STYLE)
+    font_size = options.pop("font_size", DEFAULT_FONT_SIZE)
+    engine = options.pop("engine", DEFAULT_ENGINE)
+    styles = styles or [style]
+    font_sizes = font_sizes or [font_size]
+    engines = engines or [engine]
+    options.setdefault("language", "text")
+
+    preload_lexers(languages, options.get("strip_all", False))
+    for style in styles:
+        for font_size in font_sizes:
+            for engine in engines:
+                renderer = Renderer(style=style,
+                                    font_size=font_size,
+                                    engine=engine,
+                                    **options)
+                formatter = renderer.formatter
+                if hasattr(formatter, "get_atlas"):
+                    for font in formatter.fonts.fonts.values():
+                        formatter.get_atlas(font).get_indices(WARMUP_CODE)
+                for image_format in image_formats:
+                    renderer.render_bytes(WARMUP_CODE,
+                                          image_format=image_format)
+
+    if freeze and hasattr(gc, "freeze"):
+        gc.collect()
+        gc.freeze()
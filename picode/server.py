@@ -0,0 +1,244 @@
+"""
+    A render server keeping the fonts, styles and lexers loaded between
+    conversions
+"""
+
+import json
+import os
+import socket
+import socketserver
+from argparse import ArgumentParser
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from picode.picode import Renderer, __version__
+from picode.client import DEFAULT_HOST, DEFAULT_PORT
+from picode.encoders import get_format, get_mime_type
+from picode.preload import warmup
+from picode.util import PicodeException
+
+# Number of renderers (one per set of options) kept by the server, or by each
+# worker process
+MAX_RENDERERS = 16
+
+# Renderers of the current process, by options
+_renderers = OrderedDict()
+_renderers_lock = Lock()
+
+
+def get_renderer(options: dict):
+    key = json.dumps(options, sort_keys=True)
+    with _renderers_lock:
+        renderer = _renderers.get(key)
+        if renderer is not None:
+            _renderers.move_to_end(key)
+            return renderer
+    renderer = Renderer(**options)
+    with _renderers_lock:
+        _renderers[key] = renderer
+        while len(_renderers) > MAX_RENDERERS:
+            _renderers.popitem(last=False)
+    return renderer
+
+
+def _warm_up():
+    # Loads the fonts, the default style and the lexers
+    get_renderer({}).render_bytes("print('Hello world!')\n")
+
+
+def _render(options: dict, code: str, file_name: str, image_format: str):
+    """
+        Returns (picture, error code, message), the picture being None when
+        the conversion failed.
+    """
+    if "cache" in options:
+        return None, None, "The option 'cache' isn't supported by the server."
+    try:
+        renderer = get_renderer(options)
+        return renderer.render_bytes(code, file_name, image_format), None, None
+    except PicodeException as e:
+        return None, e.error_code, e.message
+    except (TypeError, ValueError) as e:
+        return None, None, str(e)
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """
+        Handles the requests `POST /render`, whose body is a JSON object with
+        the `code`, the `file_name` used to guess the language (optional),
+        the `image_format` ("PNG" by default) and the `options` of
+        `picode.Renderer`, and `GET /health`.
+    """
+
+    server_version = "picode/" + __version__
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, content: dict):
+        self._send(status, "application/json",
+                   json.dumps(content).encode("utf-8"))
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"message": "Not found."})
+            return
+        self._send_json(200, {"version": __version__})
+
+    def do_POST(self):
+        if self.path != "/render":
+            self._send_json(404, {"message": "Not found."})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            image_format = get_format(request.get("image_format", "PNG"))
+            code = request["code"]
+            file_name = request.get("file_name")
+            options = request.get("options", {})
+        except PicodeException as e:
+            self._send_json(400, {
+                "error_code": e.error_code,
+                "message": e.message
+            })
+            return
+        except (ValueError, KeyError, AttributeError) as e:
+            self._send_json(400, {
+                "error_code": None,
+                "message": "Incorrect request: " + str(e)
+            })
+            return
+
+        data, error_code, message = self.server.render(options, code,
+                                                       file_name, image_format)
+        if data is None:
+            self._send_json(400, {"error_code": error_code, "message": message})
+            return
+        self._send(200, get_mime_type(image_format), data)
+
+    def address_string(self):
+        # Clients of a Unix socket have no address
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class RenderServer(ThreadingHTTPServer):
+    """
+        An HTTP server converting codes to pictures. The conversions are done
+        by `jobs` worker processes (all the CPUs if `jobs` is 0), or by the
+        threads handling the requests if `jobs` is 1. The fonts, styles and
+        lexers are loaded once per process.
+    """
+
+    daemon_threads = True
+
+    def __init__(self,
+                 address=(DEFAULT_HOST, DEFAULT_PORT),
+                 jobs: int = 1,
+                 verbose: bool = False):
+        self.verbose = verbose
+        if not jobs:
+            jobs = os.cpu_count() or 1
+        self.executor = None
+        if jobs > 1:
+            # Loaded once, and shared by the workers forked from this process
+            warmup()
+            self.executor = ProcessPoolExecutor(max_workers=jobs,
+                                                initializer=_warm_up)
+            # Starts the workers now, before any thread is running
+            self.executor.submit(int).result()
+        else:
+            _warm_up()
+        super().__init__(address, RenderRequestHandler)
+
+    def render(self, options: dict, code: str, file_name: str,
+               image_format: str):
+        if self.executor is None:
+            return _render(options, code, file_name, image_format)
+        return self.executor.submit(_render, options, code, file_name,
+                                    image_format).result()
+
+    def server_close(self):
+        super().server_close()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+class UnixRenderServer(RenderServer):
+    """
+        A RenderServer listening on a Unix socket.
+    """
+
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def main(argv):
+    parser = ArgumentParser(
+        prog="picode serve",
+        description=
+        "Runs a server converting codes to pictures, which keeps the fonts, styles and lexers loaded. Use 'picode --server address' to convert files with it."
+    )
+
+    parser.add_argument("--host",
+                        default=DEFAULT_HOST,
+                        help="Specifies the address the server listens on.")
+
+    parser.add_argument("--port",
+                        type=int,
+                        default=DEFAULT_PORT,
+                        help="Specifies the port the server listens on.")
+
+    parser.add_argument(
+        "--socket",
+        help="Listens on this Unix socket instead of a TCP port.")
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help=
+        "Specifies the number of processes converting the codes. 0 uses all the CPUs, 1 converts them in the server process."
+    )
+
+    parser.add_argument("--verbose",
+                        action="store_true",
+                        help="Logs every request.")
+
+    args = parser.parse_args(argv[1:])
+
+    if args.socket:
+        server = UnixRenderServer(args.socket, args.jobs, args.verbose)
+        address = "unix:" + args.socket
+    else:
+        server = RenderServer((args.host, args.port), args.jobs, args.verbose)
+        address = args.host + ":" + str(server.server_port)
+
+    print("Listening on " + address + ".")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
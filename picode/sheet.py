@@ -0,0 +1,123 @@
+"""
+    Contact sheets: many codes converted into a single picture
+"""
+
+import json
+from collections import namedtuple
+from PIL import Image
+from picode.engine import get_line_length
+from picode.picode import Renderer
+from picode.util import IncorrectSheet, read_file
+
+DEFAULT_SHEET_COLUMNS = 4
+DEFAULT_SHEET_GAP = 0
+
+# The position and size of the picture of a code in the sheet
+SheetBox = namedtuple("SheetBox", ["file", "x", "y", "width", "height"])
+
+# The picture of the sheet, and the SheetBox of each code
+Sheet = namedtuple("Sheet", ["picture", "boxes"])
+
+
+def get_sheet_layout(sizes: list, columns: int, gap: int):
+    """
+        Lays out pictures of the given (width, height) in a grid of
+        `columns` columns, each column being as wide as its widest picture
+        and each row as high as its highest one, with `gap` pixels between
+        them. Returns the (x, y) of each picture and the size of the sheet.
+    """
+    columns = max(1, min(columns, len(sizes)))
+    widths = [0] * columns
+    heights = [0] * ((len(sizes) + columns - 1) // columns)
+    for i, (width, height) in enumerate(sizes):
+        row, column = divmod(i, columns)
+        widths[column] = max(widths[column], width)
+        heights[row] = max(heights[row], height)
+
+    lefts = [sum(widths[:i]) + gap * i for i in range(columns)]
+    tops = [sum(heights[:i]) + gap * i for i in range(len(heights))]
+    positions = [
+        (lefts[i % columns], tops[i // columns]) for i in range(len(sizes))
+    ]
+    size = (sum(widths) + gap * (columns - 1),
+            sum(heights) + gap * (len(heights) - 1))
+    return positions, size
+
+
+def render_sheet(renderer,
+                 files: list,
+                 columns: int = DEFAULT_SHEET_COLUMNS,
+                 gap: int = DEFAULT_SHEET_GAP):
+    """
+        Converts `files` with `renderer` into a single picture, laid out by
+        `get_sheet_layout`. The files are lexed and measured first, so the
+        sheet is allocated once, and the picture of each file is drawn and
+        pasted into it one after the other. Returns a Sheet.
+    """
+    if not files:
+        raise IncorrectSheet("Please provide the files of the sheet.")
+    if columns < 1:
+        raise IncorrectSheet("The number of columns must be >= 1.")
+    if gap < 0:
+        raise IncorrectSheet("The gap must be >= 0.")
+
+    snippets = []
+    for file in files:
+        tokens = renderer.tokenize(read_file(file), file)
+        formatter = renderer.formatter.with_line_number_chars(
+            len(str(tokens.nb_newlines)))
+        lines = formatter.split_lines(tokens)
+        max_line_length = max((get_line_length(line) for line in lines),
+                              default=0)
+        snippets.append((file, formatter, lines,
+                         formatter.get_image_size(len(lines), max_line_length)))
+
+    positions, size = get_sheet_layout(
+        [snippet_size for _, _, _, snippet_size in snippets], columns, gap)
+
+    formatter = renderer.formatter
+    if formatter.palette is not None:
+        sheet = Image.new(
+            "P", size,
+            formatter.palette.get_index(formatter.picture_background_color))
+        sheet.putpalette(formatter.palette.data)
+    else:
+        sheet = Image.new("RGB", size, formatter.picture_background_color)
+
+    boxes = []
+    for (file, formatter, lines, size), (x, y) in zip(snippets, positions):
+        width, height = size
+        sheet.paste(formatter.render_lines(lines), (x, y))
+        boxes.append(SheetBox(file, x, y, width, height))
+    return Sheet(sheet, boxes)
+
+
+def write_sheet_index(sheet: Sheet, file_path: str):
+    """
+        Writes the size of the sheet and the box of each code as JSON.
+    """
+    width, height = sheet.picture.size
+    index = {
+        "width": width,
+        "height": height,
+        "files": [box._asdict() for box in sheet.boxes]
+    }
+    with open(file_path, "w") as file:
+        json.dump(index, file, indent=2)
+
+
+def to_sheet(files: list,
+             columns: int = DEFAULT_SHEET_COLUMNS,
+             gap: int = DEFAULT_SHEET_GAP,
+             index_path: str = None,
+             **options):
+    """
+        Converts `files` into a single picture (see `render_sheet`), the
+        options being the ones of `picode.Renderer`. If `index_path` is
+        given, the box of each file is written to it as JSON. Returns a
+        Sheet.
+    """
+    sheet = render_sheet(Renderer(**options), files, columns, gap)
+    if index_path:
+        write_sheet_index(sheet, index_path)
+    return sheet
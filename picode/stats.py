@@ -0,0 +1,93 @@
+"""
+    Statistics about the conversions of codes to pictures
+"""
+
+import time
+from contextlib import contextmanager, nullcontext
+
+# Functions called with the RenderStats of every conversion
+render_hooks = []
+
+
+class RenderStats:
+    """
+        Statistics about a conversion: the duration of each stage (in
+        seconds), the number of tokens and lines, the size of the picture,
+        and whether the caches were used.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.language = None
+        self.nb_tokens = 0
+        self.nb_lines = 0
+        self.width = 0
+        self.height = 0
+        # None when there is no cache
+        self.lexer_cache_hit = None
+        self.token_cache_hit = None
+        self.cache_hit = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (self.timings.get(name, 0) +
+                                  time.perf_counter() - start)
+
+    @property
+    def total(self):
+        return sum(self.timings.values())
+
+    def to_dict(self):
+        return {
+            "timings": dict(self.timings),
+            "total": self.total,
+            "language": self.language,
+            "nb_tokens": self.nb_tokens,
+            "nb_lines": self.nb_lines,
+            "width": self.width,
+            "height": self.height,
+            "lexer_cache_hit": self.lexer_cache_hit,
+            "token_cache_hit": self.token_cache_hit,
+            "cache_hit": self.cache_hit
+        }
+
+    def __str__(self):
+        stages = ", ".join(name + " " + format_duration(duration)
+                           for name, duration in self.timings.items())
+        return (format_duration(self.total) + " (" + stages + "), " +
+                str(self.nb_lines) + " lines, " + str(self.nb_tokens) +
+                " tokens, " + str(self.width) + "x" + str(self.height))
+
+
+def format_duration(duration: float):
+    return "{:.2f} ms".format(duration * 1000)
+
+
+def stage(stats: RenderStats, name: str):
+    """
+        Times a stage if there are stats to fill, does nothing otherwise.
+    """
+    if stats is None:
+        return nullcontext()
+    return stats.stage(name)
+
+
+def add_render_hook(hook):
+    """
+        Registers a function which is called with the RenderStats of every
+        conversion done afterwards.
+    """
+    render_hooks.append(hook)
+
+
+def remove_render_hook(hook):
+    render_hooks.remove(hook)
+
+
+def notify_render_hooks(stats: RenderStats):
+    for hook in render_hooks:
+        hook(stats)
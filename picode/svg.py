@@ -0,0 +1,210 @@
+"""
+    Vector pictures (SVG) of the codes: the text runs are written with the
+    layout of the other pictures, and nothing is rasterized
+"""
+
+import base64
+import re
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+try:
+    from fontTools import subset
+except ImportError:
+    subset = None
+
+# The font styles, as CSS descriptors
+FONT_WEIGHT_BOLD = "font-weight:bold;"
+FONT_STYLE_ITALIC = "font-style:italic;"
+
+# Name of the embedded fonts in the pictures
+EMBEDDED_FONT_FAMILY = "picode"
+
+# The control characters can't be written in XML
+control_chars_regex = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+# Whether the missing fontTools was already reported
+_warned_no_subset = False
+
+
+def can_embed_fonts():
+    """
+        Returns whether the fonts can be embedded, which needs fontTools to
+        subset them: the whole font files would be much bigger than the
+        pictures. Prints a warning the first time they can't.
+    """
+    global _warned_no_subset
+    if subset is None and not _warned_no_subset:
+        _warned_no_subset = True
+        print("Warning: fontTools isn't installed (pip install picode[svg]). "
+              "The fonts are only referenced by their name in the SVG "
+              "pictures.")
+    return subset is not None
+
+
+def get_font_data(path: str, chars):
+    """
+        Returns the TrueType font file `path` with only the glyphs of `chars`
+        (fontTools must be installed).
+    """
+    options = subset.Options()
+    options.layout_features = []
+    # The parameters of ttfautohint, which can't be subset
+    options.drop_tables += ["TTFA"]
+    font = subset.load_font(path, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text="".join(chars))
+    subsetter.subset(font)
+    buffer = BytesIO()
+    subset.save_font(font, buffer, options)
+    return buffer.getvalue()
+
+
+def _get_font_style(bold: bool, italic: bool):
+    style = FONT_WEIGHT_BOLD if bold else ""
+    if italic:
+        style += FONT_STYLE_ITALIC
+    return style
+
+
+def _rect(x: int, y: int, width: int, height: int, color: str):
+    return ('<rect x="' + str(x) + '" y="' + str(y) + '" width="' + str(width) +
+            '" height="' + str(height) + '" fill="' + color + '"/>\n')
+
+
+class SVGWriter:
+    """
+        Writes the SVG picture of lines split by a CanvasFormatter (see
+        `CanvasFormatter.iter_lines`), with the layout of its pictures.
+        The fonts of the formatter are embedded, subset to the characters
+        used, or only referenced by their family name if `embed_font` is
+        False or fontTools isn't installed.
+    """
+
+    def __init__(self, formatter, embed_font: bool = True):
+        self.formatter = formatter
+        self.embed_font = embed_font
+        self.classes = {}
+        # The characters used in each (bold, italic) style
+        self.chars = {}
+
+    def get_class(self, bold: bool, italic: bool, color: str):
+        """
+            Returns the CSS class of the texts in the style and `color`, and
+            the set of the characters used in this style.
+        """
+        key = (bold, italic, color)
+        name = self.classes.get(key)
+        if name is None:
+            name = "t" + str(len(self.classes))
+            self.classes[key] = name
+        return name, self.chars.setdefault((bold, italic), set())
+
+    def iter_svg(self, lines, nb_lines: int, max_line_length: int):
+        """
+            Yields the SVG picture of `nb_lines` lines (an iterable, consumed
+            once) as strings, so big codes are written as they're laid out.
+        """
+        formatter = self.formatter
+        width, height = formatter.get_image_size(nb_lines, max_line_length)
+        code_width, code_height = formatter.get_code_size(
+            nb_lines, max_line_length)
+        left = top = formatter.margin
+
+        yield ('<svg xmlns="http://www.w3.org/2000/svg" width="' + str(width) +
+               '" height="' + str(height) + '" viewBox="0 0 ' + str(width) +
+               " " + str(height) + '">\n')
+        yield _rect(0, 0, width, height, formatter.picture_background_color)
+        yield _rect(left, top, code_width, code_height,
+                    formatter.background_color)
+        if formatter.line_numbers and formatter.line_number_fg is not None:
+            rectw = (formatter.image_pad + formatter.line_number_width -
+                     formatter.line_number_pad)
+            yield _rect(left, top, rectw + 1, code_height,
+                        formatter.line_number_bg)
+            if formatter.line_number_separator:
+                yield _rect(left + rectw, top, 1, code_height,
+                            formatter.line_number_fg)
+
+        yield '<g xml:space="preserve">\n'
+        for chunk in self._iter_lines(lines, left + code_width):
+            yield chunk
+        yield "</g>\n"
+        yield self.get_style()
+        yield "</svg>\n"
+
+    def _iter_lines(self, lines, right: int):
+        formatter = self.formatter
+        line_height = formatter.get_line_height()
+        hl_left = (formatter.margin + formatter.image_pad +
+                   formatter.line_number_width - formatter.line_number_pad + 1)
+        # The texts are drawn from their baseline
+        ascent = formatter.fonts.get_font(False, False).getmetrics()[0]
+        line_number_class, line_number_chars = self.get_class(
+            bool(formatter.line_number_bold),
+            bool(formatter.line_number_italic), formatter.line_number_fg)
+        line_number_x = str(formatter.margin + formatter.image_pad)
+
+        for lineno, line in enumerate(lines):
+            y = formatter.get_line_y(lineno)
+            parts = []
+            if lineno + 1 in formatter.hl_lines:
+                parts.append(
+                    _rect(hl_left, y, right - hl_left, line_height + 1,
+                          formatter.hl_color))
+            texts = []
+            if formatter.line_numbers:
+                number = str(lineno + formatter.line_number_start)
+                line_number_chars.update(number)
+                texts.append('<tspan x="' + line_number_x + '" class="' +
+                             line_number_class + '">' +
+                             number.rjust(formatter.line_number_chars) +
+                             "</tspan>")
+            charno = 0
+            for text, (_, fg, bg, bold, italic) in line:
+                x = formatter.get_text_x(charno)
+                if bg:
+                    parts.append(
+                        _rect(x, y,
+                              len(text) * formatter.fontw + 1,
+                              formatter.fonth + 1, bg))
+                if not text.isspace():
+                    text = control_chars_regex.sub(" ", text)
+                    name, chars = self.get_class(bold, italic, fg)
+                    chars.update(text)
+                    texts.append('<tspan x="' + str(x) + '" class="' + name +
+                                 '">' + escape(text) + "</tspan>")
+                charno += len(text)
+            if texts:
+                parts.append('<text y="' + str(y + ascent) + '">' +
+                             "".join(texts) + "</text>\n")
+            yield "".join(parts)
+
+    def get_style(self):
+        """
+            Returns the style sheet of the picture: the fonts and the CSS
+            classes of the texts. It's written at the end of the picture, as
+            the characters of the fonts are only known once it's written.
+        """
+        fonts = self.formatter.fonts
+        name = fonts.get_font(False, False).getname()[0]
+        family = '"' + escape(name).replace('"', "") + '"'
+        rules = []
+        if self.embed_font and can_embed_fonts():
+            for (bold, italic), chars in self.chars.items():
+                path = getattr(fonts.get_font(bold, italic), "path", None)
+                if not chars or not isinstance(path, str):
+                    continue
+                data = base64.b64encode(get_font_data(path, chars))
+                rules.append("@font-face{font-family:" + EMBEDDED_FONT_FAMILY +
+                             ";" + _get_font_style(bold, italic) +
+                             "src:url(data:font/ttf;base64," + data.decode() +
+                             ') format("truetype")}')
+            family = EMBEDDED_FONT_FAMILY + "," + family
+        rules.append("text{font-family:" + family + ",monospace;font-size:" +
+                     str(fonts.font_size) + "px;white-space:pre}")
+        for (bold, italic, color), name in self.classes.items():
+            rules.append("." + name + "{" + _get_font_style(bold, italic) +
+                         "fill:" + color + "}")
+        return "<style>\n" + "\n".join(rules) + "\n</style>\n"
@@ -0,0 +1,190 @@
+"""
+    Token streams of the codes, lexed once and reused by every rendering of
+    the same code (with other styles or layouts for instance)
+"""
+
+from array import array
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Lock
+from pygments.token import string_to_tokentype
+from picode.lexers import detect_lexer, get_lexer_by_language
+from picode.util import NoCodeNorFileName
+
+# Estimated memory (in bytes) of the tokens kept
+DEFAULT_TOKEN_CACHE_SIZE = 64 * 1024 * 1024
+
+# Estimated memory (in bytes) of a token besides its text: the string object,
+# its reference in the texts and its type index
+TOKEN_OVERHEAD = 60
+
+
+class Tokens:
+    """
+        The tokens of a code, stored compactly: the distinct token types,
+        the index of the type of each token, and the texts. Iterating over
+        it gives the (token type, text) pairs, like the lexers of pygments.
+        `language` is the name of the lexer, `nb_newlines` the number of
+        line breaks of the texts: the lexers strip the code as they're
+        configured to and end it with a line break, so it's the number of
+        lines drawn (see `measure_code`). Tokens
+        are immutable, and can be pickled (to be sent to other processes for
+        instance).
+    """
+
+    __slots__ = ("language", "types", "kinds", "texts", "nb_newlines")
+
+    def __init__(self, language: str, tokens):
+        types = {}
+        kinds = array("H")
+        texts = []
+        nb_newlines = 0
+        for ttype, text in tokens:
+            kinds.append(types.setdefault(ttype, len(types)))
+            texts.append(text)
+            nb_newlines += text.count("\n")
+        self.language = language
+        self.types = tuple(types)
+        self.kinds = kinds
+        self.texts = tuple(texts)
+        self.nb_newlines = nb_newlines
+
+    def __iter__(self):
+        types = self.types
+        return (
+            (types[kind], text) for kind, text in zip(self.kinds, self.texts))
+
+    def __len__(self):
+        return len(self.texts)
+
+    @property
+    def code(self):
+        return "".join(self.texts)
+
+    def get_size(self):
+        """
+            Returns an estimate of the memory taken by the tokens, in bytes:
+            a small code split into many tokens takes much more than its
+            length.
+        """
+        return sum(map(len, self.texts)) + TOKEN_OVERHEAD * len(self.texts)
+
+    def __reduce__(self):
+        # The token types are singletons, found again by their names
+        return (_make_tokens, (self.language, tuple(map(str, self.types)),
+                               self.kinds.tobytes(), self.texts,
+                               self.nb_newlines))
+
+
+def _make_tokens(language: str, type_names: tuple, kinds: bytes, texts: tuple,
+                 nb_newlines: int):
+    tokens = Tokens.__new__(Tokens)
+    tokens.language = language
+    tokens.types = tuple(map(string_to_tokentype, type_names))
+    tokens.kinds = array("H", kinds)
+    tokens.texts = texts
+    tokens.nb_newlines = nb_newlines
+    return tokens
+
+
+class TokenCache:
+    """
+        A bounded LRU cache of the tokens of the codes, keyed by the hash of
+        the code and the lexer. It holds tokens taking about `max_size`
+        bytes in total (see `Tokens.get_size`).
+    """
+
+    def __init__(self, max_size: int = DEFAULT_TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._tokens = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            tokens = self._tokens.get(key)
+            if tokens is None:
+                self.misses += 1
+                return None
+            self._tokens.move_to_end(key)
+            self.hits += 1
+            return tokens
+
+    def put(self, key, tokens: Tokens, size: int):
+        if size > self.max_size:
+            return
+        with self._lock:
+            if key in self._tokens:
+                return
+            self._tokens[key] = (tokens, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, removed_size) = self._tokens.popitem(last=False)
+                self.size -= removed_size
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": self.size,
+                "max_size": self.max_size
+            }
+
+
+token_cache = TokenCache()
+
+
+def lex(lexer, code: str, stats=None):
+    """
+        Returns the Tokens of the code, lexed with `lexer` unless they're in
+        the cache. If a RenderStats is given, it records whether the cache
+        was used.
+    """
+    key = (sha1(code.encode("utf-8", "surrogatepass")).digest(), type(lexer),
+           repr(sorted(lexer.options.items())))
+    entry = token_cache.get(key)
+    if stats is not None:
+        stats.token_cache_hit = entry is not None
+    if entry is not None:
+        return entry[0]
+    tokens = Tokens(lexer.name, lexer.get_tokens(code))
+    token_cache.put(key, tokens, tokens.get_size())
+    return tokens
+
+
+def tokenize(code: str,
+             language: str = None,
+             file_path: str = None,
+             allowed_languages: list = None,
+             strip_all: bool = False):
+    """
+        Returns the Tokens of the code, which can be converted to pictures
+        with any options by `picode.render_tokens`. The language is guessed
+        (see `detect_lexer`) if it isn't given. The tokens are cached, so a
+        code is only lexed once.
+    """
+    if not code:
+        raise NoCodeNorFileName("Please provide a code.")
+    if language:
+        lexer = get_lexer_by_language(language, strip_all)
+    else:
+        lexer = detect_lexer(code, file_path, allowed_languages, strip_all)
+    return lex(lexer, code)
+
+
+def clear_token_cache():
+    token_cache.clear()
+
+
+def token_cache_info():
+    return token_cache.info()
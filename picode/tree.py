@@ -0,0 +1,272 @@
+"""
+    Converts the code files of directories and globs, mirroring the tree into
+    an output directory and skipping the files which didn't change since the
+    last conversion
+"""
+
+import glob
+import json
+import os
+from hashlib import sha256
+from picode.batch import RenderResult, get_page_path, render_many
+from picode.cache import make_key
+from picode.lexers import is_code_file_name
+from picode.util import IncorrectFile
+
+# Name of the manifest written in the output directory
+MANIFEST_NAME = ".picode-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _is_hidden(name: str):
+    return name.startswith(".")
+
+
+def _argument_name(path: str):
+    """
+        Returns `path` without its root, drive, "." and ".." parts:
+        `../src/app` becomes `src/app`.
+    """
+    path = os.path.splitdrive(os.path.normpath(path))[1]
+    parts = path.replace(os.sep, "/").split("/")
+    return "/".join(part for part in parts if part not in ("", ".", ".."))
+
+
+def find_files(paths: list, excluded_dirs: list = []):
+    """
+        Returns the (file, relative path) of the code files of `paths`:
+        the files themselves, the files of the globs (`**` going through
+        subdirectories), and the files of the directories and their
+        subdirectories whose name is known to a lexer. Hidden files and
+        directories, and `excluded_dirs`, are skipped. The relative paths
+        are relative to the directory or to the start of the glob, or are
+        the name of the file. With several paths, they start with the path
+        they come from (see `_argument_name`), so the files of `src` and
+        `tests` don't get the same relative path.
+    """
+    excluded_dirs = {os.path.realpath(path) for path in excluded_dirs}
+    prefixed = len(paths) > 1
+    files = []
+
+    def add(file: str, relative_path: str, base: str):
+        if prefixed:
+            relative_path = os.path.join(_argument_name(base), relative_path)
+        files.append((file, relative_path))
+
+    def walk(directory: str):
+        for root, dirs, names in os.walk(directory):
+            dirs[:] = sorted(
+                name for name in dirs if not _is_hidden(name) and
+                os.path.realpath(os.path.join(root, name)) not in excluded_dirs)
+            for name in sorted(names):
+                if not _is_hidden(name) and is_code_file_name(name):
+                    file = os.path.join(root, name)
+                    add(file, os.path.relpath(file, directory), directory)
+
+    for path in paths:
+        if os.path.isdir(path):
+            walk(path)
+        elif glob.has_magic(path):
+            # The part of the pattern before the first wildcard
+            parts = path.replace(os.sep, "/").split("/")
+            fixed = []
+            for part in parts[:-1]:
+                if glob.has_magic(part):
+                    break
+                fixed.append(part)
+            base = "/".join(fixed) or "."
+            for file in sorted(glob.glob(path, recursive=True)):
+                if os.path.isfile(file):
+                    add(file, os.path.relpath(file, base), base)
+        else:
+            add(path, os.path.basename(path), os.path.dirname(path))
+    return files
+
+
+def get_tree_output_path(relative_path: str, output_dir: str,
+                         image_format: str):
+    """
+        Returns the path of the picture of a file in the output directory:
+        `dir/name.py` becomes `output_dir/dir/name_py.png`.
+    """
+    root, extension = os.path.splitext(relative_path)
+    if extension:
+        root += "_" + extension[1:]
+    return os.path.join(output_dir, root + "." + image_format.lower())
+
+
+def hash_file(file: str):
+    digest = sha256()
+    try:
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+    except OSError as e:
+        raise IncorrectFile("Couldn't read the file '" + file + "': " + str(e))
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+        The sources of the pictures of an output directory: for each picture
+        (by path relative to the directory), the hash, size and modification
+        time of its code file and the hash of the options it was drawn with.
+    """
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        try:
+            with open(self.path, "r") as file:
+                content = json.load(file)
+            if content.get("version") == MANIFEST_VERSION:
+                self.entries = content["files"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            # A missing or broken manifest only means every file is converted
+            pass
+
+    def _key(self, output: str):
+        return os.path.relpath(output,
+                               os.path.dirname(self.path)).replace(os.sep, "/")
+
+    def is_up_to_date(self, file: str, output: str, options_hash: str,
+                      check: str):
+        """
+            Returns whether `output` was drawn from the current content of
+            `file` with the same options, and still exists. The code is only
+            hashed if its size or modification time changed.
+        """
+        entry = self.entries.get(self._key(output))
+        if (entry is None or entry.get("options") != options_hash or
+                not os.path.exists(check)):
+            return False
+        try:
+            stat = os.stat(file)
+        except OSError:
+            return False
+        if (entry.get("size") == stat.st_size and
+                entry.get("mtime") == stat.st_mtime_ns):
+            return True
+        if entry.get("source_hash") != hash_file(file):
+            return False
+        # Touched but not modified
+        entry["size"], entry["mtime"] = stat.st_size, stat.st_mtime_ns
+        return True
+
+    def record(self, file: str, output: str, options_hash: str,
+               source_hash: str, stat):
+        self.entries[self._key(output)] = {
+            "source": file,
+            "source_hash": source_hash,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "options": options_hash
+        }
+
+    def save(self):
+        # Written next to the manifest first, so it's never left incomplete
+        content = {"version": MANIFEST_VERSION, "files": self.entries}
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(content, file, indent=1, sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+
+def render_tree(paths: list,
+                output_dir: str,
+                image_format: str = "png",
+                force: bool = False,
+                jobs: int = 1,
+                max_lines_per_image: int = None,
+                stream: bool = False,
+                profile: bool = False,
+                server: str = None,
+                **options):
+    """
+        Converts the code files of `paths` (files, directories and globs,
+        see `find_files`) to pictures in `image_format`, mirroring their tree
+        into `output_dir`. A manifest kept in `output_dir` records the hash
+        of each code and of the options, so the files which didn't change
+        since the last conversion are skipped, unless `force` is True.
+        If `server` (host:port or unix:path) is given, the files are sent to
+        this render server, or converted here if it can't be reached. The
+        other parameters are the ones of `render_many`. Returns a
+        RenderResult per file, whose `skipped` is True for the files which
+        were up to date.
+    """
+    from picode.picode import Renderer
+
+    # Checks the options, and normalizes them for the manifest
+    renderer = Renderer(**options)
+    options_hash = make_key(
+        "", None, dict(renderer.options,
+                       max_lines_per_image=max_lines_per_image), image_format)
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = Manifest(output_dir)
+
+    results = {}
+    files, outputs, sources = [], [], []
+    for file, relative_path in find_files(paths, [output_dir]):
+        output = get_tree_output_path(relative_path, output_dir, image_format)
+        if output in results:
+            other = results[output].file
+            if os.path.realpath(other) == os.path.realpath(file):
+                # The same file, given twice
+                continue
+            error = IncorrectFile("Couldn't convert the file '" + file +
+                                  "': its picture '" + output +
+                                  "' is the one of the file '" + other + "'")
+            results[(output, file)] = RenderResult(file, output,
+                                                   error.error_code,
+                                                   error.message)
+            continue
+        check = (get_page_path(output, 1) if max_lines_per_image else output)
+        try:
+            if not force and manifest.is_up_to_date(file, output, options_hash,
+                                                    check):
+                results[output] = RenderResult(file,
+                                               output,
+                                               None,
+                                               None,
+                                               skipped=True)
+                continue
+            # Hashed before the conversion, so a file modified meanwhile is
+            # converted again next time
+            source_hash = hash_file(file)
+            try:
+                stat = os.stat(file)
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+            except OSError as e:
+                raise IncorrectFile("Couldn't convert the file '" + file +
+                                    "': " + str(e))
+        except IncorrectFile as e:
+            results[output] = RenderResult(file, output, e.error_code,
+                                           e.message)
+            continue
+        sources.append((source_hash, stat))
+        files.append(file)
+        outputs.append(output)
+        results[output] = RenderResult(file, output, None, None)
+
+    converted = []
+    if server and files and not stream and not max_lines_per_image:
+        from picode.client import forward
+        converted = forward(server, files, outputs, **options)
+    # The files the server didn't convert
+    if len(converted) < len(files):
+        converted += render_many(files[len(converted):],
+                                 outputs[len(converted):],
+                                 jobs=jobs,
+                                 max_lines_per_image=max_lines_per_image,
+                                 stream=stream,
+                                 profile=profile,
+                                 **options)
+
+    for result, (source_hash, stat) in zip(converted, sources):
+        results[result.output] = result
+        if result.error_code is None and result.message is None:
+            manifest.record(result.file, result.output, options_hash,
+                            source_hash, stat)
+    manifest.save()
+    return list(results.values())
@@ -51,6 +51,42 @@ class IncorrectColor(PicodeException):
         super(IncorrectColor, self).__init__(105, message)
 
 
+class IncorrectFile(PicodeException):
+
+    def __init__(self, message):
+        super(IncorrectFile, self).__init__(106, message)
+
+
+class IncorrectMaxLinesPerImage(PicodeException):
+
+    def __init__(self, message):
+        super(IncorrectMaxLinesPerImage, self).__init__(107, message)
+
+
+class IncorrectEngine(PicodeException):
+
+    def __init__(self, message):
+        super(IncorrectEngine, self).__init__(108, message)
+
+
+class IncorrectEncoding(PicodeException):
+
+    def __init__(self, message):
+        super(IncorrectEncoding, self).__init__(109, message)
+
+
+class IncorrectSheet(PicodeException):
+
+    def __init__(self, message):
+        super(IncorrectSheet, self).__init__(110, message)
+
+
+def read_file(file_path: str):
+    # The encoding is sniffed (see picode.ingest), not the locale's one
+    from picode.ingest import read_code
+    return read_code(file_path)
+
+
 def is_a_correct_hexadecimal_color(color: str):
     return len(color) == 7 and bool(color_regex.match(color))
 
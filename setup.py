@@ -34,13 +34,12 @@ setup(
         "Development Status :: 3 - Alpha",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.1",
-        "Programming Language :: Python :: 3.2",
-        "Programming Language :: Python :: 3.3",
-        "Programming Language :: Python :: 3.4",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
         "Operating System :: MacOS :: MacOS X",
         "Operating System :: Microsoft :: Windows", "Operating System :: POSIX",
         "Programming Language :: Python"
@@ -52,7 +51,11 @@ setup(
         "Bug Reports": "https://github.com/Beafantles/picode/issues"
     },
     install_requires=["pillow", "pygments"],
-    python_requires=">=3",
+    extras_require={
+        "fast": ["numpy"],
+        "svg": ["fonttools"]
+    },
+    python_requires=">=3.7",
     packages=["picode"],
     # So the file .pypirc can be located in the current directory
     cmdclass={
@@ -61,5 +64,5 @@ setup(
     },
     include_package_data=True,
     entry_points={
-        'console_scripts': ['picode = picode:run_main'],
+        'console_scripts': ['picode = picode.cli:run_main'],
     })
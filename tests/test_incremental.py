@@ -0,0 +1,114 @@
+"""
+    The pictures of IncrementalRenderer must be the ones of a full conversion
+"""
+
+import random
+import pytest
+from picode.incremental import IncrementalRenderer
+from picode.picode import Renderer
+
+CODE = '''import os
+
+
+def walk(directory: str, depth: int = 0):
+    """Prints the files of a directory."""
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+\t\t    walk(path, depth + 1)
+        else:
+            print("  " * depth + name)  # a file
+'''
+
+NEW_LINES = [
+    "", "x = 1", "    return None", "# some comment", "\tindented()",
+    "def f(a, b):", 'print("a much longer line than all the other ones")',
+    "''' a string", "'''", "class A: pass"
+]
+
+
+def edit(rng, lines):
+    lines = list(lines)
+    action = rng.choice(["insert", "delete", "replace", "move"])
+    if action == "insert" or len(lines) < 2:
+        for _ in range(rng.randint(1, 3)):
+            lines.insert(rng.randint(0, len(lines)), rng.choice(NEW_LINES))
+    elif action == "delete":
+        start = rng.randrange(len(lines))
+        del lines[start:start + rng.randint(1, 3)]
+    elif action == "replace":
+        lines[rng.randrange(len(lines))] = rng.choice(NEW_LINES)
+    else:
+        line = lines.pop(rng.randrange(len(lines)))
+        lines.insert(rng.randint(0, len(lines)), line)
+    return lines
+
+
+def assert_same_picture(im, expected):
+    assert im.mode == expected.mode
+    assert im.size == expected.size
+    assert im.tobytes() == expected.tobytes()
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {
+        "show_line_numbers": True,
+        "show_line_numbers_separator": True
+    },
+    {
+        "lines_highlighted": [2, 5, 9]
+    },
+    {
+        "engine": "atlas",
+        "style": "friendly"
+    },
+])
+def test_random_edits(options):
+    if options.get("engine") == "atlas":
+        pytest.importorskip("numpy")
+    rng = random.Random(12)
+    renderer = Renderer(language="python", **options)
+    incremental = IncrementalRenderer(language="python", **options)
+    lines = CODE.split("\n")
+    for _ in range(60):
+        lines = edit(rng, lines)
+        code = "\n".join(lines)
+        if not code.strip():
+            continue
+        assert_same_picture(incremental.render(code), renderer.render(code))
+
+
+def test_unchanged_lines_are_not_drawn():
+    incremental = IncrementalRenderer(language="python")
+    incremental.render(CODE)
+    code = CODE.replace("the files", "the names")
+    im = incremental.render(code)
+    assert incremental.changed_lines == [5]
+    # The line below is drawn again too, as the glyphs may go over it
+    assert incremental.redrawn_lines == 2
+    assert_same_picture(im, Renderer(language="python").render(code))
+
+
+@pytest.mark.parametrize("nb_lines", [9, 99])
+@pytest.mark.parametrize("engine", ["pillow", "atlas"])
+def test_line_number_width_changes(nb_lines, engine):
+    if engine == "atlas":
+        pytest.importorskip("numpy")
+    options = dict(language="python",
+                   engine=engine,
+                   show_line_numbers=True,
+                   show_line_numbers_separator=True)
+    renderer = Renderer(**options)
+    incremental = IncrementalRenderer(**options)
+    lines = ["x_" + str(i) + " = " + str(i) for i in range(nb_lines - 2)]
+    # The number of lines goes past nb_lines and back, one line at a time
+    for count in [
+            nb_lines - 1, nb_lines, nb_lines + 1, nb_lines + 2, nb_lines,
+            nb_lines - 1, nb_lines + 1
+    ]:
+        while len(lines) < count:
+            lines.insert(len(lines) // 2, "y = " + str(len(lines)))
+        del lines[count:]
+        code = "\n".join(lines) + "\n"
+        assert_same_picture(incremental.render(code), renderer.render(code))
@@ -0,0 +1,88 @@
+"""
+    The code files measured from their bytes must have the size of the
+    decoded codes
+"""
+
+import codecs
+import pytest
+from pygments.lexers import PythonLexer
+from picode.engine import measure_code
+from picode.ingest import CodeFile, read_code, sniff_encoding
+
+CODES = [
+    "x = 1",
+    "x = 1\n",
+    "\n\n\ndef f():\n    return 'é'\n\n\n",
+    "\tif a:\n\t\treturn b\n    \tc = 'tab\tinside'\n",
+    "ab\tc\n" + "é" * 7 + "\tx\n" + "\t" * 3 + "\n",
+    "  \n  spaces around  \n  \n",
+    "\n\n",
+    "# naïve — ≠ 漢字 😀\nlast line without break",
+    "x" * 300 + "\n" + "\t" * 40 + "y\n",
+]
+
+LEXERS = [
+    None,
+    PythonLexer(),
+    PythonLexer(stripnl=False),
+    PythonLexer(stripall=True),
+]
+
+
+def write(tmp_path, data: bytes):
+    path = tmp_path / "code.py"
+    path.write_bytes(data)
+    return str(path)
+
+
+def assert_same_size(path: str, code: str):
+    assert read_code(path) == code
+    for lexer in LEXERS:
+        with CodeFile(path) as file:
+            assert file.measure(lexer) == measure_code(code, lexer)
+
+
+@pytest.mark.parametrize("code", CODES)
+def test_utf8(tmp_path, code):
+    assert_same_size(write(tmp_path, code.encode("utf-8")), code)
+
+
+@pytest.mark.parametrize("code", CODES)
+def test_utf8_bom(tmp_path, code):
+    data = codecs.BOM_UTF8 + code.encode("utf-8")
+    assert_same_size(write(tmp_path, data), code)
+
+
+@pytest.mark.parametrize("code", CODES)
+def test_latin1(tmp_path, code):
+    code = "# -*- coding: latin-1 -*-\n" + code
+    code = code.encode("latin-1", "replace").decode("latin-1")
+    path = write(tmp_path, code.encode("latin-1"))
+    with CodeFile(path) as file:
+        assert file.encoding == "iso8859-1"
+    assert_same_size(path, code)
+
+
+@pytest.mark.parametrize("code", CODES)
+def test_utf16(tmp_path, code):
+    assert_same_size(write(tmp_path, code.encode("utf-16")), code)
+
+
+@pytest.mark.parametrize("code", CODES[:4])
+def test_line_breaks(tmp_path, code):
+    path = write(tmp_path, code.replace("\n", "\r\n").encode("utf-8"))
+    assert_same_size(path, code)
+
+
+def test_empty_file(tmp_path):
+    path = write(tmp_path, b"")
+    with CodeFile(path) as file:
+        assert file.read() == ""
+        assert file.measure() == measure_code("")
+
+
+def test_sniff_encoding():
+    assert sniff_encoding(codecs.BOM_UTF32_LE + b"x\0\0\0") == ("utf-32-le", 4)
+    assert sniff_encoding("x = 1\n".encode("utf-16-le")) == ("utf-16-le", 0)
+    assert sniff_encoding("é\n".encode("utf-8")) == ("utf-8", 0)
+    assert sniff_encoding(b"#!/bin/python\n# coding=cp1252\n") == ("cp1252", 0)
@@ -0,0 +1,88 @@
+"""
+    The PNG pictures written a few lines at a time must be the ones drawn at
+    once
+"""
+
+from io import BytesIO
+import pytest
+from PIL import Image
+from picode.picode import Renderer
+
+
+def make_code(nb_lines: int):
+    # Various lengths, tabs, and glyphs going below their line
+    return "\n".join(
+        ("\t" * (i % 3) + "def f_" + str(i) + "(y):  # gjpq" + "_" * (i % 7))
+        for i in range(nb_lines)) + "\n"
+
+
+def assert_same_picture(im, expected):
+    assert im.size == expected.size
+    assert im.convert("RGB").tobytes() == expected.convert("RGB").tobytes()
+
+
+def render_stream(renderer, code: str, tile_lines: int):
+    output = BytesIO()
+    renderer.render_stream(code, output, tile_lines=tile_lines)
+    output.seek(0)
+    with Image.open(output) as im:
+        assert im.format == "PNG"
+        im.load()
+        return im
+
+
+@pytest.mark.parametrize("nb_lines", [1, 7, 8, 9, 10, 24])
+@pytest.mark.parametrize("tile_lines", [1, 3, 8])
+@pytest.mark.parametrize("show_line_numbers", [False, True])
+def test_tile_boundaries(nb_lines, tile_lines, show_line_numbers):
+    renderer = Renderer(language="python",
+                        lines_highlighted=[1, 8, 9],
+                        show_line_numbers=show_line_numbers,
+                        show_line_numbers_separator=True)
+    code = make_code(nb_lines)
+    assert_same_picture(render_stream(renderer, code, tile_lines),
+                        renderer.render(code))
+
+
+@pytest.mark.parametrize("options", [
+    {
+        "show_line_numbers": True,
+        "show_line_numbers_separator": True,
+        "margin": 0
+    },
+    {
+        "palette": True
+    },
+    {
+        "engine": "atlas",
+        "style": "friendly",
+        "show_line_numbers": True
+    },
+])
+def test_options(options):
+    if options.get("engine") == "atlas":
+        pytest.importorskip("numpy")
+    renderer = Renderer(language="python", **options)
+    code = make_code(20)
+    assert_same_picture(render_stream(renderer, code, 6), renderer.render(code))
+
+
+@pytest.mark.parametrize("code", [
+    "\n\n" + make_code(9) + "\n\n",
+    make_code(10).replace("\n", "\r\n").rstrip(),
+])
+def test_stripped_line_breaks(code):
+    # The line numbers are as wide as the number of lines drawn
+    renderer = Renderer(language="python", show_line_numbers=True)
+    assert_same_picture(render_stream(renderer, code, 4), renderer.render(code))
+
+
+def test_file(tmp_path):
+    path = tmp_path / "code.py"
+    code = make_code(30)
+    path.write_text(code, encoding="utf-8")
+    renderer = Renderer(show_line_numbers=True)
+    output = tmp_path / "code.png"
+    renderer.render_file_stream(str(path), str(output), tile_lines=4)
+    with Image.open(output) as im:
+        assert_same_picture(im, renderer.render_file(str(path)))